@@ -1,242 +1,307 @@
 # clock/app_monitor.py
 import time
-import platform
-import sqlite3
 from datetime import date
 from pynput import keyboard, mouse
-
-if platform.system() == "Windows":
-    import win32gui
-    import win32process
-    import uiautomation as auto
-elif platform.system() == "Darwin":
-    from AppKit import NSWorkspace
-    import Quartz
-from threading import Thread
-import os
-from distraction import DetectDistraction
+from threading import Lock
+from collections import deque
+from focus_backends import get_backend
+from app_registry import AppRegistry, FocusCounters
+from scheduler import TickScheduler
+from usage_writer import UsageWriter
+from classifier_cache import ClassificationCache
 
 class AppMonitor:
-    def __init__(self, title, db_path, afk_threshold):
-        self.app_times = {}  # {app_name: time_in_seconds}
+    """Tracks focus time per app.
+
+    All monitor state is owned by `self.scheduler`: sampling, AFK evaluation,
+    minimize enforcement and classification results run as jobs on its single
+    thread. Other threads read through snapshot() and get_app_times().
+    """
+
+    def __init__(self, db_path, afk_threshold, autosave=True, backend=None):
+        self.backend = backend or get_backend()  # Platform hooks for the focused window
+        self.scheduler = TickScheduler("app-monitor")
+        self.listeners = []  # Called on the scheduler thread with (app_name, category) on focus or category changes
+        self.registry = AppRegistry(db_path)  # Interned app ids from the apps table
+        self.counters = FocusCounters()  # Totals of closed spans by app id, in descending order
+        self.current_id = None  # App id of self.current_app
+        self.spans = deque(maxlen=10000)  # Recent closed (app_name, start, end) spans on the monotonic clock
+        self.span_start = None  # Monotonic start of the span for self.current_app
+        self.span_flushed = None  # Watermark up to which the open span was handed to the writer
+        self.span_lock = Lock()  # Guards span state for readers on other threads
+        self.sample_job = None
+        self.sample_interval = 1  # Seconds between focus samples; precision does not depend on it
         self.db_path = db_path
         self.current_app = None
         self.category = None
         self.monitoring = False
         self.afk_detection = False
-        self.last_activity_time = time.time()
+        self.last_activity_time = time.monotonic()  # Written lock-free by the input callbacks
+        self.afk = False  # True while the idle span is being counted as afk_time
         self.afk_threshold = afk_threshold  # Set AFK threshold from settings
         self.afk_app_name = "afk_time"
-        self.afk_thread = None  # Add this line to track the AFK detection thread
+        self.afk_job = None
+        self.input_listeners = []  # pynput listeners feeding last_activity_time
         self.minimize = False  # Initialize the minimize attribute
+        self.enforcement_cooldown = 10  # Minimum seconds between two minimize actions
+        self.enforcement_actions = 0  # Windows minimized so far
+        self.enforcement_cpu_time = 0.0  # Thread CPU seconds spent minimizing
+        self.last_enforcement = None  # Monotonic time of the last minimize action
+        self.enforced_span = None  # span_start of the switch that was last enforced
+        self.enforcement_retry = None  # Pending job for a switch that arrived during the cooldown
+        self.url_recheck_delay = 5  # Seconds to wait for a browser URL to load before re-sampling
+        self.url_recheck = None  # Pending job for the deferred browser re-check
+        self.awaiting_url = False  # A browser switch waits for the re-check before anything is minimized
+        self.writer = UsageWriter(db_path, checkpoint=lambda: self.scheduler.call_and_wait(self.checkpoint), periodic=autosave)
+        self.classifier = ClassificationCache(db_path, on_result=lambda app_name, category: self.scheduler.call_soon(self._on_classified, app_name, category))
 
     def start_monitoring(self):
         """Start monitoring the focused application."""
         self.monitoring = True
-        Thread(target=self._monitor_loop, daemon=True).start()
+        self.writer.start()
+        self.scheduler.start()
+        self.sample_job = self.scheduler.every(self.sample_interval, self._sample, delay=0)
 
-    def stop_monitoring(self):
-        """Stop monitoring the focused application."""
+    def stop_monitoring(self, save=True):
+        """Stop monitoring the focused application and stop the writer."""
         self.monitoring = False
+        if self.sample_job:
+            self.sample_job.cancel()
+            self.sample_job = None
+        self.scheduler.call_and_wait(self._close_span, time.monotonic())
+        self.stop_afk_detection()
+        self.scheduler.stop()
+        self.writer.stop(flush=save)
+        self.classifier.shutdown()
+
+    def set_sample_interval(self, seconds):
+        """Change how often the focused app is sampled."""
+        self.sample_interval = seconds
+        if self.sample_job:
+            self.sample_job.cancel()
+            self.sample_job = self.scheduler.every(seconds, self._sample)
+
+    def subscribe(self, listener):
+        """Call listener(app_name, category) on the scheduler thread when focus or category changes."""
+        self.listeners.append(listener)
+
+    def _notify(self):
+        for listener in self.listeners:
+            try:
+                listener(self.current_app, self.category)
+            except Exception as e:
+                print(f"Error in focus listener: {e}")
+
+    def snapshot(self):
+        """Return a consistent copy of the monitor state for other threads."""
+        with self.span_lock:
+            return {"current_app": self.current_app, "category": self.category, "afk": self.afk}
 
     def start_afk_detection(self):
         """Start AFK detection by monitoring keyboard and mouse activity."""
-        if not self.afk_detection:
-            self.afk_detection = True
-            self.afk_thread = Thread(target=self._afk_monitor_loop, daemon=True)
-            self.afk_thread.start()
+        if self.afk_detection:
+            return
+        self.afk_detection = True
+        monotonic = time.monotonic
+
+        def on_activity(*args):
+            # Runs for every input event, so it only stores a timestamp
+            self.last_activity_time = monotonic()
+
+        self.last_activity_time = monotonic()
+        self.input_listeners = [keyboard.Listener(on_press=on_activity), mouse.Listener(on_click=on_activity, on_move=on_activity)]
+        for listener in self.input_listeners:
+            listener.start()
+        self.afk_job = self.scheduler.every(1, self._check_afk)
 
     def stop_afk_detection(self):
         """Stop AFK detection."""
         self.afk_detection = False
-        if self.afk_thread:
-            self.afk_thread.join()  # Ensure the thread is properly stopped
-            self.afk_thread = None
-        
+        if self.afk_job:
+            self.afk_job.cancel()
+            self.afk_job = None
+        for listener in self.input_listeners:
+            listener.stop()
+        self.input_listeners = []
+        self.scheduler.call_soon(self._leave_afk)
+
+    def _leave_afk(self):
+        if self.afk:
+            self.afk = False
+            self._sample()
+
     def start_minimize(self):
-        """Start minimizing unproductive apps."""
+        """Start minimizing unproductive apps on every switch into one."""
         self.minimize = True
-        Thread(target=self._minimize_loop, daemon=True).start()
-        
+        self.scheduler.call_soon(self._enforce, self.current_app)
+
     def stop_minimize(self):
         """Stop minimizing unproductive apps."""
         self.minimize = False
-        
-    def _minimize_loop(self):
-        """Minimize unproductive apps."""
-        while self.minimize:
-            focused_app = self._get_focused_app()
-            if focused_app:
-                self._minimize_distraction(focused_app)
-
-    def _afk_monitor_loop(self):
-        """Monitor for AFK status."""
-        def on_activity(*args):
-            self.last_activity_time = time.time()
-
-        with keyboard.Listener(on_press=on_activity), mouse.Listener(on_click=on_activity, on_move=on_activity):
-            while self.afk_detection:
-                if time.time() - self.last_activity_time > self.afk_threshold:
-                    self.current_app = self.afk_app_name  # Set current app to AFK
-                    self._update_app_time(self.afk_app_name)  # Start counting AFK time
-                time.sleep(1)
-
-    def _monitor_loop(self):
-        """Continuously monitor the focused application."""
-        while self.monitoring:
-            focused_app = self._get_focused_app()
-            if focused_app:
-                self._update_app_time(focused_app)
-            time.sleep(1)
-            
-    def _find_address_bar(self, window):
-        """Find the address bar control by traversing the window's UI hierarchy."""
-        try:
-            # Traverse through child elements
-            for control in window.GetChildren():
-                if control.ControlTypeName == "Edit" or "address" in control.Name.lower() or "url" in control.Name.lower():
-                    return control.GetValuePattern().Value
-                # Recursively search child controls
-                sub_result = self._find_address_bar(control)
-                if sub_result:
-                    return sub_result
-        except Exception:
-            return None  # Suppress errors and return None
-        return None
+        self.scheduler.call_soon(self._cancel_pending_checks)
 
-    def _get_browser_url(self):
-        """Fetch the URL from the browser's address bar."""
-        try:
-            # Get the foreground window control
-            with auto.UIAutomationInitializerInThread():
-                window = auto.GetForegroundControl()
-            if not window:
-                pass
-
-            # Check if the window is a browser
-            if "chrome" in window.Name.lower() or "edge" in window.Name.lower():
-                url = self._find_address_bar(window)
-                return url if url else None
-
-            return None
-        except Exception:
-            return "Error fetching browser URL."
-
-    def _get_browser_url_mac(self, browser_name="Google Chrome"):
-        """Fetch the URL from the specified browser on macOS."""
+    def _cancel_pending_checks(self):
+        for job in (self.url_recheck, self.enforcement_retry):
+            if job:
+                job.cancel()
+        self.url_recheck = None
+        self.enforcement_retry = None
+        self.awaiting_url = False
+
+    def _enforce(self, app_name):
+        """Minimize `app_name` once per switch into it if it is NONPRODUCTIVE."""
+        if not self.minimize or not app_name or self.category != "NONPRODUCTIVE" or app_name != self.current_app:
+            return
+        if self.awaiting_url:
+            return  # Decided once _recheck_focus has the loaded URL, not on a placeholder title
+        if self.enforced_span == self.span_start:
+            return  # Already acted on this switch
+        now = time.monotonic()
+        if self.last_enforcement is not None and now - self.last_enforcement < self.enforcement_cooldown:
+            if self.enforcement_retry is None:
+                # Try again once the cooldown has passed, for whichever app has focus by then
+                self.enforcement_retry = self.scheduler.call_later(self.enforcement_cooldown - (now - self.last_enforcement), self._retry_enforce)
+            return
+        self.enforced_span = self.span_start
+        self.last_enforcement = now
+        started = time.thread_time()
         try:
-            script = f"""
-            tell application "{browser_name}"
-                if (count of windows) > 0 then
-                    return URL of {"current tab of front window" if browser_name in ["Safari", "Firefox"] else "active tab of front window"}
-                else
-                    return ""
-                end if
-            end tell
-            """
-            url = os.popen(f"osascript -e '{script}'").read().strip()
-            return url if url else None  # Return None if no URL is found
+            self.backend.minimize_window(app_name)
+            self.enforcement_actions += 1
         except Exception as e:
-            return f"Error fetching URL from {browser_name}: {str(e)}"
+            print(f"Error minimizing {app_name}: {e}")
+        self.enforcement_cpu_time += time.thread_time() - started
+
+    def _retry_enforce(self):
+        self.enforcement_retry = None
+        self._enforce(self.current_app)
 
+    def get_enforcement_stats(self):
+        """Return the counters of the minimize enforcement."""
+        return {"actions": self.enforcement_actions, "cpu_time": self.enforcement_cpu_time}
+
+    def _check_afk(self):
+        """Enter or leave AFK based on the last input time; runs at most once per second."""
+        now = time.monotonic()
+        last_activity = self.last_activity_time
+        if self.afk:
+            if self.span_start is None:
+                return  # Monitoring stopped and closed the AFK span
+            if last_activity > self.span_start:
+                self._leave_afk()  # Back at the keyboard, attribute time to the focused app again
+            return
+        if now - last_activity <= self.afk_threshold:
+            return
+        # Move the idle time since the last input from the current app to afk_time
+        afk_start = max(last_activity, self.span_start or last_activity)
+        self.afk = True
+        self._update_app_time(self.afk_app_name, afk_start)
+
+    def _sample(self):
+        """Record the currently focused application."""
+        if self.afk:
+            return  # The AFK span keeps running until input resumes
+        focused_app = self._get_focused_app()
+        if focused_app:
+            self._update_app_time(focused_app)
+
+    def _recheck_focus(self):
+        """Re-sample once a browser had time to load its URL."""
+        self.url_recheck = None
+        self.awaiting_url = False
+        if self.monitoring:
+            self._sample()
+            if not self.awaiting_url:
+                self._enforce(self.current_app)  # The focus may not have changed, so no switch enforced it
+            
     def _get_focused_app(self):
-        """Get the name of the currently focused application."""
+        """Get the name of the currently focused application, or the domain for browsers."""
         try:
-            win_browsers = ["Chrome", "Edge"]
-            mac_browsers = ["Google Chrome", "Safari"]
-            win_name = None
-
-            if platform.system() == "Windows":
-                hwnd = win32gui.GetForegroundWindow()
-                win_name = win32gui.GetWindowText(hwnd)
-                if win_name and any(browser in win_name for browser in win_browsers):
-                    if self.minimize:
-                        time.sleep(5)  # Wait for the URL to load
-                    url = self._get_browser_url()
-                    if url:
-                        url = url.split('/')[2] if '//' in url else url.split('/')[0]
-                        return url
-            elif platform.system() == "Darwin":
-                active_app = NSWorkspace.sharedWorkspace().frontmostApplication()
-                win_name = active_app.localizedName()
-                browser_name = [browser for browser in mac_browsers if browser in win_name]
-                if browser_name:
-                    if self.minimize:
-                        time.sleep(5)  # Wait for the URL to load
-                    url = self._get_browser_url_mac(browser_name[0])
-                    if url:
-                        url = url.split('/')[2] if '//' in url else url.split('/')[0]
-                        return url
-            return win_name
+            app_name = self.backend.get_focused_app()
+            browser_name = self.backend.get_browser(app_name)
+            if not browser_name:
+                self.awaiting_url = False
+                return app_name
+            url = self.backend.get_browser_url(browser_name)
+            if url:
+                url = url.split('/')[2] if '//' in url else url.split('/')[0]
+            focused = url or app_name
+            if self.minimize and focused != self.current_app:
+                # The URL may still be loading, look again later instead of blocking
+                self.awaiting_url = True
+                if self.url_recheck is None:
+                    self.url_recheck = self.scheduler.call_later(self.url_recheck_delay, self._recheck_focus)
+            return focused
         except Exception as e:
             print(f"Error detecting focused app: {e}")
         return None
-    
-    def _minimize_distraction(self, app_name):
-        if self._get_focused_app() != app_name:
-            return
-        if platform.system() == "Windows":
-            hwnd = win32gui.GetForegroundWindow()
-            if self.category == "NONPRODUCTIVE":
-                win32gui.ShowWindow(hwnd, 6)  # Minimize the window
-        elif platform.system() == "Darwin":
-            process_name = app_name
-            if self.category == "NONPRODUCTIVE":
-                os.system(f"osascript -e 'tell application \"{process_name}\" to set miniaturized of front window to true'")
-
-    def _update_app_time(self, app_name):
-        """Update the focus time for the given application."""
-        if app_name != self.current_app:
-            self.current_app = app_name
-            try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT category FROM classify_app WHERE app_name = ?", (app_name,))
-                result = cursor.fetchone()
-                if not result:
-                    detector = DetectDistraction()
-                    category = detector.classify(app_name)
-                    cursor.execute(
-                        """
-                        INSERT INTO classify_app (app_name, category)
-                        VALUES (?, ?)
-                        ON CONFLICT(app_name) DO UPDATE SET category = excluded.category
-                        """, (app_name, category)
-                    )
-                    conn.commit()
-                    conn.close()
-                    self.category = category
-                    return
-                self.category = result[0]
+
+    def _close_span(self, now):
+        """Close the open focus span at `now` and fold it into the totals."""
+        with self.span_lock:
+            if self.current_app is None or self.span_start is None:
                 return
-            except Exception as e:
-                print(f"Error detecting distraction: {e}")
-        elif app_name == self.current_app:
-            self.app_times[app_name] = self.app_times.get(app_name, 0) + 1
-
-    def get_app_times(self):
-        """Return the accumulated focus times for each application."""
-        return {app: time for app, time in sorted(self.app_times.items(), key=lambda x: -x[1])}
-
-    def save_focus_times(self, db_path):
-        """Save the accumulated focus times to the database."""
-        retries = 5
-        while retries > 0:
-            try:
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                for app_name, focus_time in self.app_times.items():
-                    cursor.execute("""
-                        INSERT INTO usage_data (date, app_name, focus_time)
-                        VALUES (?, ?, ?)
-                        ON CONFLICT(date, app_name) DO UPDATE SET focus_time = focus_time + excluded.focus_time
-                    """, (date.today().isoformat(), app_name, focus_time))
-                conn.commit()
-                conn.close()
-                break
-            except sqlite3.OperationalError as e:
-                if 'database is locked' in str(e):
-                    retries -= 1
-                    time.sleep(1)
-                else:
-                    raise
+            start = self.span_start
+            self.spans.append((self.current_app, start, now))
+            self.counters.add(self.current_id, now - start)
+            self.writer.put(date.today().isoformat(), self.current_app, now - self.span_flushed)
+            self.span_start = None
+            self.span_flushed = None
+
+    def checkpoint(self):
+        """Hand the unsaved part of the open span to the writer and advance the watermark."""
+        now = time.monotonic()
+        with self.span_lock:
+            if self.current_app is None or self.span_start is None:
+                return
+            self.writer.put(date.today().isoformat(), self.current_app, now - self.span_flushed)
+            self.span_flushed = now
+
+    def _switch_app(self, app_name, now):
+        """Close the current span and open a new one for `app_name`."""
+        self._close_span(now)
+        app_id = self.registry.intern(app_name)
+        with self.span_lock:
+            self.current_app = self.registry.name(app_id)
+            self.current_id = app_id
+            self.span_start = now
+            self.span_flushed = now
+            self.category = None
+
+    def _update_app_time(self, app_name, now=None):
+        """Record a focus sample for the given application, switching spans at `now`."""
+        if app_name == self.current_app and self.span_start is not None:
+            return  # The open span keeps running until the focus changes
+        self._switch_app(app_name, now if now is not None else time.monotonic())
+        if app_name != self.afk_app_name:
+            self.category = self.classifier.get(app_name)
+        self._notify()
+        self._enforce(app_name)
+
+    def _on_classified(self, app_name, category):
+        """Apply a background classification if the app still has focus."""
+        if app_name == self.current_app:
+            self.category = category
+            self._notify()
+            self._enforce(app_name)
+
+    def get_app_times(self, limit=None):
+        """Return focus times in descending order, including the open span, optionally only the top `limit`."""
+        with self.span_lock:
+            ranked = self.counters.top() if limit is None else self.counters.top(limit + 1)
+            if self.current_id is not None and self.span_start is not None:
+                live = self.counters.get(self.current_id) + (time.monotonic() - self.span_start)
+                ranked = [(app_id, seconds) for app_id, seconds in ranked if app_id != self.current_id]
+                # The running app only moves up, so one insertion keeps the order
+                position = 0
+                while position < len(ranked) and ranked[position][1] >= live:
+                    position += 1
+                ranked.insert(position, (self.current_id, live))
+        if limit is not None:
+            ranked = ranked[:limit]
+        name = self.registry.name
+        return {name(app_id): seconds for app_id, seconds in ranked}
+
+    def save_focus_times(self):
+        """Ask the writer to persist everything recorded so far; each second is written once."""
+        self.writer.request_flush()
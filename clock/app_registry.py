@@ -0,0 +1,97 @@
+# clock/app_registry.py
+import sqlite3
+import sys
+from array import array
+from storage import Storage
+
+class AppRegistry:
+    """Interns app and domain names to the small integer ids of the `apps` table."""
+
+    def __init__(self, db_path):
+        self.storage = Storage.open(db_path)
+        self.ids = {}  # {app_name: app_id}
+        self.names = {}  # {app_id: app_name}
+        self.loaded = False
+
+    def load(self):
+        """Load the known names once."""
+        if self.loaded:
+            return
+        self.loaded = True
+        try:
+            rows = self.storage.app_ids()
+        except sqlite3.Error as e:
+            print(f"Error loading app ids: {e}")
+            return
+        for app_id, name in rows:
+            self._remember(app_id, name)
+
+    def intern(self, name):
+        """Return the id for `name`, adding it to the apps table on first sight."""
+        app_id = self.ids.get(name)
+        if app_id is not None:
+            return app_id
+        self.load()
+        app_id = self.ids.get(name)
+        if app_id is not None:
+            return app_id
+        try:
+            app_id = self.storage.intern_app(name)
+        except sqlite3.Error as e:
+            print(f"Error storing app id for {name}: {e}")
+            app_id = -len(self.ids) - 1  # Session-only id until the database is reachable
+        self._remember(app_id, name)
+        return app_id
+
+    def name(self, app_id):
+        return self.names[app_id]
+
+    def _remember(self, app_id, name):
+        name = sys.intern(name)
+        self.ids[name] = app_id
+        self.names[app_id] = name
+
+class FocusCounters:
+    """Array-backed focus totals keyed by app id, kept in descending order incrementally."""
+
+    def __init__(self):
+        self.slots = {}  # {app_id: slot} for compact arrays even with sparse ids
+        self.app_ids = array('q')  # App id per slot
+        self.totals = array('d')  # Seconds per slot
+        self.order = array('l')  # Slots by descending total
+        self.rank = array('l')  # Position of each slot in self.order
+
+    def add(self, app_id, seconds):
+        """Add `seconds` (may be negative) and restore the order with neighbour swaps."""
+        slot = self.slots.get(app_id)
+        if slot is None:
+            slot = len(self.totals)
+            self.slots[app_id] = slot
+            self.app_ids.append(app_id)
+            self.totals.append(0.0)
+            self.rank.append(len(self.order))
+            self.order.append(slot)
+        self.totals[slot] += seconds
+        position = self.rank[slot]
+        totals, order = self.totals, self.order
+        while position > 0 and totals[order[position - 1]] < totals[slot]:
+            self._swap(position, position - 1)
+            position -= 1
+        while position + 1 < len(order) and totals[order[position + 1]] > totals[slot]:
+            self._swap(position, position + 1)
+            position += 1
+
+    def _swap(self, a, b):
+        order, rank = self.order, self.rank
+        order[a], order[b] = order[b], order[a]
+        rank[order[a]] = a
+        rank[order[b]] = b
+
+    def get(self, app_id):
+        slot = self.slots.get(app_id)
+        return self.totals[slot] if slot is not None else 0.0
+
+    def top(self, limit=None):
+        """Return [(app_id, seconds)] in descending order, optionally only the first `limit`."""
+        order = self.order if limit is None else self.order[:limit]
+        return [(self.app_ids[slot], self.totals[slot]) for slot in order]
@@ -1,22 +1,46 @@
 import customtkinter as ctk
 from tkinter import ttk
-import sqlite3
 from datetime import date, timedelta
 import os
 import calendar  # Import calendar module
+from collections import OrderedDict
 from dashboard import format_time
+from storage import Storage
+from query_dispatcher import QueryDispatcher
 
 class CalendarView:
-    def __init__(self, root, back_callback):
+    def __init__(self, root, back_callback, db_path=None, queries=None):
         self.root = root
-        self.db_path = os.path.join(os.path.dirname(__file__), '../db/usage_data.db')
+        self.db_path = db_path or os.path.join(os.path.dirname(__file__), '../db/usage_data.db')
+        self.storage = Storage.open(self.db_path)
+        self.queries = queries or QueryDispatcher(root)  # Runs the view's queries off the Tk thread
         self.current_date = date.today()
-        self.min_date = self.get_earliest_date()
+        self.min_date = date.today()  # Until the earliest date has been loaded
         self.tree = None
         self.back_callback = back_callback  # Callback to return to the previous view
+        self.months = OrderedDict()  # LRU of {(year, month): (usage version, {day: seconds})}
+        self.month_cache_size = 12
+        self.days = OrderedDict()  # LRU of {date: ((usage, names) versions, [(app_name, seconds)])}
+        self.day_cache_size = 60
+        self.prefetch_days = 3  # Days either side of the shown one loaded in the background
+        self.loading = {}  # {(cache key, version): QueryTicket} of loads in flight
+        self.style_applied = False
+        self.day_buttons = {}  # {day of month: button} of the month shown
+        self.load_earliest_date()
+
+    def back(self):
+        """Leave the calendar, dropping any queries still in flight."""
+        self.cancel_loads()
+        self.back_callback()
+
+    def cancel_loads(self):
+        """Drop the queries of the view being left, forgetting the loads they were for."""
+        self.queries.cancel(self)
+        self.loading = {key: ticket for key, ticket in self.loading.items() if not ticket.cancelled}
 
     def show_calendar(self):
         """Override the current window with the Calendar View."""
+        self.cancel_loads()
         for widget in self.root.winfo_children():
             widget.destroy()
 
@@ -37,24 +61,10 @@ class CalendarView:
         self.next_button = ctk.CTkButton(nav_frame, text="▶", command=self.next_day)
         self.next_button.pack(side=ctk.LEFT, padx=10)
 
-        if self.current_date == date.today():
-            self.next_button.configure(state="disabled")
+        self.update_nav_buttons()
 
         # Display Treeview
-        style = ttk.Style()
-        style.theme_use("clam")  # Use a theme that allows customization
-        style.configure("Treeview", 
-                        background="#333333", 
-                        foreground="white", 
-                        fieldbackground="#333333", 
-                        font=("Arial", 12),
-                        borderwidth=0,  # Remove border
-                        highlightthickness=0)  # Remove highlight border
-        style.configure("Treeview.Heading", 
-                        background="#444444", 
-                        foreground="white", 
-                        font=("Arial", 12, "bold"))
-        style.map('Treeview', background=[('selected', '#555555')], foreground=[('selected', 'grey')])
+        self.apply_style()
 
         self.root.configure(bg="#222222")  # Set background color of parent frame
 
@@ -66,13 +76,34 @@ class CalendarView:
         button_frame = ctk.CTkFrame(self.root)
         button_frame.pack(pady=10)
 
-        ctk.CTkButton(button_frame, text="Back to Dashboard", command=self.back_callback).pack(side=ctk.LEFT, padx=5)
+        ctk.CTkButton(button_frame, text="Back to Dashboard", command=self.back).pack(side=ctk.LEFT, padx=5)
         ctk.CTkButton(button_frame, text="Monthly View", command=self.show_monthly_view).pack(side=ctk.LEFT, padx=5)  # Add button for monthly view
 
         self.update_data()
 
+    def apply_style(self):
+        """Configure the Treeview style; ttk styles are global, so once is enough."""
+        if self.style_applied:
+            return
+        self.style_applied = True
+        style = ttk.Style()
+        style.theme_use("clam")  # Use a theme that allows customization
+        style.configure("Treeview", 
+                        background="#333333", 
+                        foreground="white", 
+                        fieldbackground="#333333", 
+                        font=("Arial", 12),
+                        borderwidth=0,  # Remove border
+                        highlightthickness=0)  # Remove highlight border
+        style.configure("Treeview.Heading", 
+                        background="#444444", 
+                        foreground="white", 
+                        font=("Arial", 12, "bold"))
+        style.map('Treeview', background=[('selected', '#555555')], foreground=[('selected', 'grey')])
+
     def show_monthly_view(self):
         """Override the current window with the Monthly View."""
+        self.cancel_loads()
         for widget in self.root.winfo_children():
             widget.destroy()
 
@@ -96,9 +127,10 @@ class CalendarView:
         ctk.CTkButton(self.root, text="Back to Calendar", command=self.show_calendar).pack(pady=10)
 
     def display_month_calendar(self):
-        """Display a month calendar inline with color-coded days based on data availability."""
+        """Display a month calendar inline with days shaded by focus time."""
         for widget in self.days_frame.winfo_children():
             widget.destroy()
+        self.day_buttons = {}  # {day of month: button}
 
         # Create day-of-week headers
         for col, day in enumerate(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']):
@@ -112,22 +144,17 @@ class CalendarView:
                 if day == 0:
                     continue
 
-                day_date = date(self.current_date.year, self.current_date.month, day)
-                has_data = self.check_day_has_data(day_date)
-
-                # Color-code days based on whether they have data
-                bg_color = "#FFFFFF" if has_data else "#A9A9A9"
-                text_color = "#000000"  # Set text color to black
-
+                # Shown as loading (grey, disabled) until the month's data arrives
                 day_button = ctk.CTkButton(
                     self.days_frame,
                     text=str(day),
-                    fg_color=bg_color,
-                    text_color=text_color,  # Set text color
-                    state="normal" if has_data else "disabled",
+                    fg_color="#A9A9A9",
+                    text_color="#000000",  # Set text color to black
+                    state="disabled",
                     command=lambda d=day: self.select_date(d)
                 )
                 day_button.grid(row=row, column=col, padx=5, pady=5, sticky="nsew")
+                self.day_buttons[day] = day_button
 
         # Make the calendar responsive
         for i in range(7):
@@ -135,73 +162,194 @@ class CalendarView:
         for i in range(len(month_days) + 1):
             self.days_frame.grid_rowconfigure(i, weight=1)
 
+        year, month = self.current_date.year, self.current_date.month
+        totals = self.cached_month(year, month)
+        if totals is not None:
+            self.shade_days(totals)
+        else:
+            self.load_month(year, month, on_result=self.shade_days, owner=self)
+        self.prefetch_adjacent_months(year, month)
+
+    def month_totals(self, year, month):
+        """Return {day: seconds} for the days of the month with data (runs on a query worker)."""
+        days = calendar.monthrange(year, month)[1]
+        totals = self.storage.daily_totals(date(year, month, 1).isoformat(), date(year, month, days).isoformat())
+        return {date.fromisoformat(day).day: seconds for day, seconds in totals.items()}
+
+    def cached_month(self, year, month):
+        """Return the cached totals of a month, or None if missing or older than the stored data."""
+        return self._cache_get(self.months, (year, month), self.month_version(year, month))
+
+    def month_version(self, year, month):
+        """Usage version of the month's dates; autosave flushes to other months leave it alone."""
+        days = calendar.monthrange(year, month)[1]
+        return self.storage.usage_version(date(year, month, 1).isoformat(), date(year, month, days).isoformat())
+
+    def load_month(self, year, month, on_result=None, owner=None):
+        """Load a month's totals on a query worker into the cache."""
+        key = ((year, month), version)
+        if on_result is None and key in self.loading:
+            return  # A prefetch is already on its way
+
+        def loaded(totals):
+            self.loading.pop(key, None)
+            self._cache_put(self.months, (year, month), version, totals, self.month_cache_size)
+            if on_result:
+                on_result(totals)
+
+        def failed(e):
+            self.loading.pop(key, None)
+            print(f"Error loading {year}-{month:02d} totals: {e}")
+
+        self.loading[key] = self.queries.submit(self.month_totals, year, month, on_result=loaded, on_error=failed, owner=owner)
+
+    def _cache_get(self, cache, key, version, touch=True):
+        """Return the cached value for `key` if it was loaded at `version`, else None."""
+        entry = cache.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        if touch:
+            cache.move_to_end(key)
+        return entry[1]
+
+    def _cache_put(self, cache, key, version, value, size):
+        cache[key] = (version, value)
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+
+    def prefetch_adjacent_months(self, year, month):
+        """Warm the cache with the months either side so navigating to them is instant."""
+        first = date(year, month, 1)
+        for day in (first - timedelta(days=1), first + timedelta(days=31)):
+            if day <= date.today() and self.cached_month(day.year, day.month) is None:
+                self.load_month(day.year, day.month)
+
+    def shade_days(self, totals):
+        """Color-code the day buttons by focus time relative to the busiest day of the month."""
+        busiest = max(totals.values(), default=0)
+        for day, day_button in self.day_buttons.items():
+            seconds = totals.get(day, 0)
+            if seconds <= 0 or not day_button.winfo_exists():
+                continue
+            intensity = seconds / busiest
+            day_button.configure(
+                fg_color=shade(intensity),
+                text_color="#FFFFFF" if intensity > 0.5 else "#000000",
+                state="normal"
+            )
+
     def select_date(self, day):
         """Handle date selection in monthly view."""
         self.current_date = date(self.current_date.year, self.current_date.month, day)
         self.show_calendar()
-        # Update button states
-        self.previous_button.configure(state="normal" if self.current_date > self.min_date else "disabled")
-        self.next_button.configure(state="normal" if self.current_date < date.today() else "disabled")
 
     def update_data(self):
-        """Fetch and display daily data."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT app_name, focus_time FROM usage_data WHERE date = ?", (self.current_date.isoformat(),))
-        records = cursor.fetchall()
-        conn.close()
-
-        self.tree.delete(*self.tree.get_children())
-        for app, time in records:
-            time = format_time(time)
-            self.tree.insert('', 'end', values=(app, time))
+        """Show the day's records from the cache, or load them showing a loading row meanwhile."""
+        self.cancel_loads()
+        day = self.current_date
+        records = self._cache_get(self.days, day, self.day_version(day))
+        if records is not None:
+            self.show_data(day, records)
+        else:
+            self.show_data(day, [("Loading...", None)])
+            self.load_day(day, on_result=lambda records: self.show_data(day, records), owner=self)
+        self.prefetch_adjacent_days(day)
+
+    def day_version(self, day):
+        """Versions a day's records depend on: writes to that date and app renames."""
+        return self.storage.usage_version(day.isoformat(), day.isoformat()), self.storage.version("names")
+
+    def load_day(self, day, on_result=None, owner=None):
+        """Load a day's records on a query worker into the cache."""
+        version = self.day_version(day)
+        if on_result is None and (day, version) in self.loading:
+            return  # A prefetch is already on its way
+
+        def loaded(records):
+            self.loading.pop((day, version), None)
+            self._cache_put(self.days, day, version, records, self.day_cache_size)
+            if on_result:
+                on_result(records)
+
+        def failed(e):
+            self.loading.pop((day, version), None)
+            print(f"Error loading records for {day}: {e}")
+
+        self.loading[(day, version)] = self.queries.submit(self.storage.usage_for_date, day.isoformat(), on_result=loaded, on_error=failed, owner=owner)
+
+    def prefetch_adjacent_days(self, day):
+        """Warm the cache with the days either side so stepping to them needs no query."""
+        for offset in range(1, self.prefetch_days + 1):
+            for neighbour in (day - timedelta(days=offset), day + timedelta(days=offset)):
+                if self.min_date <= neighbour <= date.today() and self._cache_get(self.days, neighbour, self.day_version(neighbour), touch=False) is None:
+                    self.load_day(neighbour)
+
+    def show_data(self, day, records):
+        """Display the records of `day` unless the user has moved on, reusing the existing rows."""
+        if day != self.current_date or not self.tree.winfo_exists():
+            return
+        rows = self.tree.get_children()
+        for index, (app, time) in enumerate(records):
+            values = (app, format_time(time) if time is not None else "")
+            if index < len(rows):
+                self.tree.item(rows[index], values=values)
+            else:
+                self.tree.insert('', 'end', values=values)
+        if len(rows) > len(records):
+            self.tree.delete(*rows[len(records):])
 
     def previous_day(self):
         if self.current_date > self.min_date:
             self.current_date -= timedelta(days=1)
             self.update_data()
             self.date_label.configure(text=self.current_date.isoformat())
-    
-    # Update button states
-        self.previous_button.configure(state="normal" if self.current_date > self.min_date else "disabled")
-        self.next_button.configure(state="normal" if self.current_date < date.today() else "disabled")
+        self.update_nav_buttons()
 
     def next_day(self):
         if self.current_date < date.today():
             self.current_date += timedelta(days=1)
             self.update_data()
             self.date_label.configure(text=self.current_date.isoformat())
-        
-        # Update button states
+        self.update_nav_buttons()
+
+    def update_nav_buttons(self):
+        """Enable the day navigation buttons that lead to days in range."""
+        previous_button = getattr(self, "previous_button", None)
+        if previous_button is None or not previous_button.winfo_exists():
+            return  # The day view is not shown
         self.previous_button.configure(state="normal" if self.current_date > self.min_date else "disabled")
         self.next_button.configure(state="normal" if self.current_date < date.today() else "disabled")
 
-
     def previous_month(self):
         """Navigate to the previous month."""
         self.current_date = self.current_date.replace(day=1) - timedelta(days=1)
-        self.show_monthly_view()
+        self.show_month()
 
     def next_month(self):
         """Navigate to the next month."""
         self.current_date = self.current_date.replace(day=28) + timedelta(days=4)
         self.current_date = self.current_date.replace(day=1)
-        self.show_monthly_view()
+        self.show_month()
+
+    def show_month(self):
+        """Redraw only the month label and day grid."""
+        self.cancel_loads()
+        self.month_label.configure(text=f"{calendar.month_name[self.current_date.month]} {self.current_date.year}")
+        self.display_month_calendar()
 
     def get_earliest_date(self):
         """Get the earliest saved date."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT MIN(date) FROM usage_data")
-        result = cursor.fetchone()[0]
-        conn.close()
+        result = self.storage.earliest_date()
         return date.fromisoformat(result) if result else date.today()
 
-    def check_day_has_data(self, day_date):
-        """Check if the given day has stored data in the database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM usage_data WHERE date = ?", (day_date.isoformat(),))
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count > 0
\ No newline at end of file
+    def load_earliest_date(self):
+        """Load the earliest saved date in the background and refresh the navigation buttons."""
+        def loaded(min_date):
+            self.min_date = min_date
+            self.update_nav_buttons()
+        self.queries.submit(self.get_earliest_date, on_result=loaded)
+
+def shade(intensity, light=(0xD8, 0xF3, 0xDC), dark=(0x1B, 0x5E, 0x20)):
+    """Return a hex color between `light` (little focus time) and `dark` (the most) for 0 < intensity <= 1."""
+    return "#" + "".join(f"{round(low + (high - low) * intensity):02X}" for low, high in zip(light, dark))
@@ -0,0 +1,137 @@
+# clock/classifier_cache.py
+import sqlite3
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from distraction import DetectDistraction, UNKNOWN
+from storage import Storage
+from local_classifier import LocalClassifier, normalize_category
+
+PENDING = "PENDING"
+
+class ClassificationCache:
+    """In-process LRU cache of app categories with background classification of misses."""
+
+    def __init__(self, db_path, max_size=4096, workers=2, max_pending=64, batch_size=32, negative_ttl=300, on_result=None,
+                 remote=True, confidence_threshold=0.8):
+        self.storage = Storage.open(db_path)
+        self.local = LocalClassifier()
+        self.remote = remote  # Fall back to DetectDistraction for low-confidence predictions
+        self.confidence_threshold = confidence_threshold
+        self.max_size = max_size
+        self.workers = workers
+        self.batch_size = batch_size  # Misses sent to DetectDistraction.classify_many at once
+        self.max_pending = max_pending  # Misses beyond this are retried on a later switch
+        self.negative_ttl = negative_ttl  # Seconds before a failed classification is retried
+        self.on_result = on_result  # Called with (app_name, category) from a worker thread
+        self.entries = OrderedDict()  # {app_name: (category, expires_at or None)}
+        self.pending = set()
+        self.queue = deque()  # Misses waiting for a worker
+        self.active = 0  # Workers currently draining the queue
+        self.lock = Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="classify")
+        self.detector = None
+        self.loaded = False
+
+    def load(self):
+        """Load the known categories from classify_app once."""
+        if self.loaded:
+            return
+        self.loaded = True
+        try:
+            rows = self.storage.classifications()
+            labels = self.storage.labels()
+        except sqlite3.Error as e:
+            print(f"Error loading classifications: {e}")
+            return
+        self.local.train(labels)  # Remote guesses are cached but never trained on
+        with self.lock:
+            for app_name, category in rows[-self.max_size:]:
+                category = normalize_category(category)
+                if category:
+                    self.entries[app_name] = (category, None)
+
+    def get(self, app_name):
+        """Return the cached category, or PENDING while a worker classifies the app."""
+        self.load()
+        with self.lock:
+            entry = self.entries.get(app_name)
+            if entry is not None:
+                category, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self.entries.move_to_end(app_name)
+                    return category
+                del self.entries[app_name]  # Expired negative entry, classify again
+            category, confidence = self.local.predict(app_name)
+            if category and (confidence >= self.confidence_threshold or not self.remote):
+                # Predictions expire so they pick up later retraining
+                self._store(app_name, category, time.monotonic() + self.negative_ttl)
+                return category
+            if not self.remote:
+                self._store(app_name, UNKNOWN, time.monotonic() + self.negative_ttl)
+                return UNKNOWN
+            if app_name in self.pending or len(self.pending) >= self.max_pending:
+                return PENDING
+            self.pending.add(app_name)
+            self.queue.append(app_name)
+            if self.active >= self.workers:
+                return PENDING  # A running worker will pick it up
+            self.active += 1
+        self.executor.submit(self._drain)
+        return PENDING
+
+    def set(self, app_name, category):
+        """Store a known category, e.g. one the user picked, and train the local model on it."""
+        category = normalize_category(category)
+        self.local.learn(app_name, category)
+        with self.lock:
+            if category:
+                self._store(app_name, category, None)
+            else:
+                self.entries.pop(app_name, None)  # Not a usable label, predict it again
+
+    def _store(self, app_name, category, expires_at):
+        self.entries[app_name] = (category, expires_at)
+        self.entries.move_to_end(app_name)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def _drain(self):
+        """Classify queued misses in batches until the queue is empty."""
+        while True:
+            with self.lock:
+                batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+                if not batch:
+                    self.active -= 1
+                    return
+            self._classify(batch)
+
+    def _classify(self, names):
+        """Classify `names` on a worker thread and persist the known results, without training on them."""
+        try:
+            if self.detector is None:
+                self.detector = DetectDistraction()
+            results = self.detector.classify_many(names)
+        except Exception as e:
+            print(f"Error detecting distraction: {e}")
+            results = {}
+        known = [(name, category) for name, category in results.items() if category != UNKNOWN]
+        if known:
+            try:
+                self.storage.set_classifications(known, labelled=False)
+            except sqlite3.Error as e:
+                print(f"Error saving classifications: {e}")
+        expires_at = time.monotonic() + self.negative_ttl
+        with self.lock:
+            for name in names:
+                category = results.get(name, UNKNOWN)
+                self._store(name, category, expires_at if category == UNKNOWN else None)
+                self.pending.discard(name)
+        if self.on_result:
+            for name in names:
+                self.on_result(name, results.get(name, UNKNOWN))
+
+    def shutdown(self):
+        """Stop accepting work and drop queued classifications."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,24 +1,38 @@
+import math
 import customtkinter as ctk
 from tkinter import ttk
-import sqlite3
 from utils import show_ok_popup, format_time
+from storage import Storage
+from virtual_list import VirtualList
+from query_dispatcher import QueryDispatcher
+from deadline_timer import DeadlineTimer
 
 class ProductivityDashboard:
-    def __init__(self, root, app_monitor, rename_callback, db_path, stop_distract):
+    def __init__(self, root, app_monitor, rename_callback, db_path, stop_distract, queries=None):
         self.root = root
         self.app_monitor = app_monitor
         self.stop_distract = stop_distract
         self.tree = None
         self.rename_callback = rename_callback
-        self.update_job = None  # To track scheduled updates
+        self.timer = DeadlineTimer(root, self.show_remaining, self.task_complete)  # Counts down the running task
+        self.refresh_job = None  # To track the scheduled dashboard refresh
+        self.row_ids = {}  # {app_name: Treeview iid}, stable for the session
+        self.live_rows = {}  # {app_name: (display_name, whole seconds)} as shown by display_times
+        self.live_order = []  # App names in their current Treeview order
         self.db_path = db_path  # Add db_path attribute
+        self.storage = Storage.open(db_path)
+        self.queries = queries or QueryDispatcher(root)  # Runs view queries off the Tk thread
         self.viewing_total_times = False  # Track if viewing total times
+        self.viewing_scheduler = False  # The scheduler owns the tree while it is open
+        self.total_times = None  # VirtualList over the all-time totals while they are shown
+        self.total_times_descending = True
         self.schedules = []  # Track all schedules
         self.schedule = None  # Track the scheduler window
         self.schedule_name = None
 
     def display(self):
         """Display the dashboard with a tree view of focused app times."""
+        self.viewing_total_times = self.viewing_scheduler = False  # The views below are rebuilt from scratch
         ctk.CTkLabel(self.root, text="Dashboard", font=("Arial", 16)).pack(pady=10)
         self._time_display()
         
@@ -39,7 +53,7 @@ class ProductivityDashboard:
 
     def save_focus_times(self):
         """Save the focus times to the database."""
-        self.app_monitor.save_focus_times(self.db_path)
+        self.app_monitor.save_focus_times()
         
     def _time_display(self):
         style = ttk.Style()
@@ -60,6 +74,7 @@ class ProductivityDashboard:
         self.root.configure(bg="#222222")  # Set background color of parent frame
 
         self.tree = ttk.Treeview(self.root, columns=('App', 'Time (s)'), show='headings', selectmode="browse", style="Treeview")
+        self._reset_live_rows()  # A new tree starts empty
         self.tree.heading('App', text='Application')
         self.tree.heading('Time (s)', text='Focus Time (s)')
         self.tree.pack(fill=ctk.BOTH, expand=True, padx=10, pady=10)
@@ -68,65 +83,96 @@ class ProductivityDashboard:
         """Update the dashboard tree view with current data."""
         if self.tree is None or not self.tree.winfo_exists():
             return  # Prevent errors if tree is destroyed or doesn't exist
+        if self.viewing_total_times or self.viewing_scheduler:
+            return  # Another view owns the tree; its exit restarts the updates
+
+        if self.refresh_job:
+            self.root.after_cancel(self.refresh_job)  # Called directly, e.g. after a rename
+        if self.live_order and not self.tree.exists(self.row_ids[self.live_order[0]]):
+            self._reset_live_rows()  # Another view cleared the tree
 
         app_times = self.app_monitor.get_app_times()
         custom_names = self._get_custom_names()
-        self.tree.delete(*self.tree.get_children())  # Clear existing data
-
-        for app, time in app_times.items():
-            display_name = custom_names.get(app, app)
-            human_readable_time = format_time(time)
-            self.tree.insert('', 'end', values=(display_name, human_readable_time))
+        self._apply_rows(app_times, custom_names)
 
         # Schedule the next update
-        self.update_job = self.root.after(1000, self.display_times)
+        self.refresh_job = self.root.after(1000, self.display_times)
+
+    def _apply_rows(self, app_times, custom_names):
+        """Bring the tree in line with `app_times`, touching only rows that changed or moved."""
+        tree, live_rows, order = self.tree, self.live_rows, self.live_order
+
+        for app in [app for app in live_rows if app not in app_times]:
+            tree.delete(self.row_ids[app])
+            del live_rows[app]
+            order.remove(app)
+
+        for position, (app, time) in enumerate(app_times.items()):
+            row = (custom_names.get(app, app), int(time))
+            iid = self.row_ids.get(app)
+            if iid is None:
+                iid = self.row_ids[app] = f"app{len(self.row_ids)}"
+            shown = live_rows.get(app)
+            if shown is None:
+                tree.insert('', position, iid=iid, values=(row[0], format_time(row[1])))
+                order.insert(position, app)
+            else:
+                if shown != row:
+                    tree.item(iid, values=(row[0], format_time(row[1])))
+                if order[position] != app:
+                    # Only apps whose rank changed get here; the rest line up again behind them
+                    tree.move(iid, '', position)
+                    order.remove(app)
+                    order.insert(position, app)
+            live_rows[app] = row
+
+    def _clear_tree(self):
+        """Remove every row before another view fills the tree."""
+        self.tree.delete(*self.tree.get_children())
+        self._reset_live_rows()
+
+    def _reset_live_rows(self):
+        self.live_rows = {}
+        self.live_order = []
 
     def _get_custom_names(self):
-        """Retrieve custom app names from the database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT original_name, custom_name FROM app_names")
-        custom_names = {row[0]: row[1] for row in cursor.fetchall()}
-        conn.close()
-        return custom_names
+        """Retrieve custom app names; Storage caches them until the next rename."""
+        return self.storage.custom_names()
 
     def stop_updates(self):
         """Stop periodic updates when leaving the dashboard."""
-        if self.update_job:
-            self.root.after_cancel(self.update_job)
-            self.update_job = None
-            
+        if self.refresh_job:
+            self.root.after_cancel(self.refresh_job)
+            self.refresh_job = None
+        self.end_run()
+
+    def end_run(self):
+        """End the running schedule along with the distraction detection it started."""
+        if self.timer.active:
+            self.timer.cancel()
+            self.stop_distract.stop()
+
 
     def edit_name(self, event=None):
         """Allow users to rename app names inline."""
         selected_item = self.tree.focus()
-        if not selected_item:
-            return
+        if not selected_item or self.viewing_scheduler:
+            return  # Scheduler rows are tasks, not apps
 
         old_name = self.tree.item(selected_item, 'values')[0]
         new_name = ctk.CTkInputDialog(text=f"Rename '{old_name}' to:", title="Rename Application").get_input()
         
         if new_name and new_name.strip():
             new_name = new_name.strip()
-            try:
-                self.rename_callback(old_name, new_name)
-            except sqlite3.IntegrityError:
-                self.merge_focus_times(old_name, new_name)
-            self.display_times()
+            self.rename_callback(old_name, new_name)  # Merges into new_name if it already exists
+            if self.viewing_total_times:
+                self.total_times.load()  # Show the merged totals
+            else:
+                self.display_times()
 
     def merge_focus_times(self, old_name, new_name):
         """Merge focus times for the old and new app names."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE usage_data
-            SET focus_time = focus_time + (SELECT focus_time FROM usage_data WHERE app_name = ?)
-            WHERE app_name = ? AND date IN (SELECT date FROM usage_data WHERE app_name = ?)
-        """, (old_name, new_name, old_name))
-        cursor.execute("DELETE FROM usage_data WHERE app_name = ?", (old_name,))
-        cursor.execute("INSERT OR REPLACE INTO app_names (original_name, custom_name) VALUES (?, ?)", (old_name, new_name))
-        conn.commit()
-        conn.close()
+        self.storage.merge_app(old_name, new_name)
 
     def view_total_times(self):
         """Display total time spent on each application in the same tree view."""
@@ -139,18 +185,16 @@ class ProductivityDashboard:
                 widget.configure(text="Total Times")
                 break
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT app_name, SUM(focus_time) FROM usage_data GROUP BY app_name ORDER BY SUM(focus_time) DESC")
-        records = cursor.fetchall()
-        conn.close()
-
-        self.tree.delete(*self.tree.get_children())  # Clear existing data
-        
-        for record in records:
-            app = record[0]
-            time = format_time(record[1])
-            self.tree.insert('', 'end', values=(app, time))
+        self._clear_tree()  # Clear existing data
+        self.total_times = VirtualList(
+            self.tree,
+            fetch=lambda after, limit, backward: self.storage.usage_totals_page(after, limit, self.total_times_descending, backward),
+            format_row=lambda record: (record[0], format_time(record[1])),
+            queries=self.queries,
+            loading_values=("Loading...", ""),
+        )
+        self.total_times_descending = True
+        self.total_times.load()
 
         # Clear existing buttons
         for widget in self.button_frame.winfo_children():
@@ -161,24 +205,19 @@ class ProductivityDashboard:
         self.button_frame.grid_columnconfigure(2, weight=1)
 
         # Add new buttons for sorting and exiting
-        ctk.CTkButton(self.button_frame, text="Sort Ascending", command=lambda: self.sort_treeview("asc", records)).grid(row=0, column=0, padx=5, pady=5, sticky="ew")
-        ctk.CTkButton(self.button_frame, text="Sort Descending", command=lambda: self.sort_treeview("desc", records)).grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+        ctk.CTkButton(self.button_frame, text="Sort Ascending", command=lambda: self.sort_treeview("asc")).grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        ctk.CTkButton(self.button_frame, text="Sort Descending", command=lambda: self.sort_treeview("desc")).grid(row=0, column=1, padx=5, pady=5, sticky="ew")
         ctk.CTkButton(self.button_frame, text="Exit", command=self.exit_total_times_view).grid(row=0, column=2, padx=5, pady=5, sticky="ew")
 
-    def sort_treeview(self, order, records):
-        """Sort the tree view based on the total focus time."""
-        sorted_records = sorted(records, key=lambda x: x[1], reverse=(order == "desc"))
-
-        self.tree.delete(*self.tree.get_children())  # Clear existing data
-
-        for record in sorted_records:
-            app = record[0]
-            time = format_time(record[1])
-            self.tree.insert('', 'end', values=(app, time))
+    def sort_treeview(self, order):
+        """Sort the tree view based on the total focus time; the database does the sorting."""
+        self.total_times_descending = order == "desc"
+        self.total_times.load()
 
     def exit_total_times_view(self):
         """Exit the total times view and return to the normal view."""
         self.viewing_total_times = False
+        self.total_times.detach()
         self.display_times()  # Resume periodic updates
 
         # Change the label back to "Dashboard"
@@ -203,6 +242,7 @@ class ProductivityDashboard:
     def open_scheduler(self):
         """Open the scheduler window to manage tasks."""
         self.stop_updates()  # Stop periodic updates
+        self.viewing_scheduler = True
 
         # Change the label to "Scheduler"
         for widget in self.root.winfo_children():
@@ -210,19 +250,15 @@ class ProductivityDashboard:
                 widget.configure(text="Scheduler")
                 break
 
-        self.tree.delete(*self.tree.get_children())  # Clear existing data
+        self._clear_tree()  # Clear existing data
 
         # Retrieve all schedules from the database
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM schedule")
-        schedules = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        
-        self.schedules = schedules
+        def loaded(schedules):
+            self.schedules = schedules
+            if schedules:
+                self.load_selected_schedule(self.schedule_name)
 
-        if schedules:
-            self.load_selected_schedule(self.schedule_name)
+        self.queries.submit(self.storage.schedule_names, on_result=loaded, owner=self)
 
         # Clear existing buttons
         for widget in self.button_frame.winfo_children():
@@ -236,6 +272,10 @@ class ProductivityDashboard:
         self.button_frame.grid_columnconfigure(4, weight=1)
         self.button_frame.grid_columnconfigure(5, weight=1)
         self.button_frame.grid_columnconfigure(6, weight=1)
+        self.button_frame.grid_columnconfigure(7, weight=1)
+        self.button_frame.grid_columnconfigure(8, weight=1)
+        self.button_frame.grid_columnconfigure(9, weight=1)
+        self.button_frame.grid_columnconfigure(10, weight=1)
 
         ctk.CTkButton(self.button_frame, text="Add Task", command=self.add_task).grid(row=0, column=0, padx=5, pady=5, sticky="ew")
         ctk.CTkButton(self.button_frame, text="Edit Task", command=self.edit_task).grid(row=0, column=1, padx=5, pady=5, sticky="ew")
@@ -244,6 +284,11 @@ class ProductivityDashboard:
         ctk.CTkButton(self.button_frame, text="Select Schedule", command=self.select_schedule).grid(row=0, column=4, padx=5, pady=5, sticky="ew")
         ctk.CTkButton(self.button_frame, text="Start", command=self.start_schedule).grid(row=0, column=5, padx=5, pady=5, sticky="ew")
         ctk.CTkButton(self.button_frame, text="Finish", command=self.finish_task_early).grid(row=0, column=6, padx=5, pady=5, sticky="ew")
+        ctk.CTkButton(self.button_frame, text="Move Up", command=lambda: self.move_task(-1)).grid(row=0, column=7, padx=5, pady=5, sticky="ew")
+        ctk.CTkButton(self.button_frame, text="Move Down", command=lambda: self.move_task(1)).grid(row=0, column=8, padx=5, pady=5, sticky="ew")
+        self.pause_button = ctk.CTkButton(self.button_frame, text="Pause", command=self.toggle_pause)
+        self.pause_button.grid(row=0, column=9, padx=5, pady=5, sticky="ew")
+        ctk.CTkButton(self.button_frame, text="From Technique", command=self.add_technique_schedule).grid(row=0, column=10, padx=5, pady=5, sticky="ew")
         
     def select_schedule(self):
         # Create a new window for schedule selection
@@ -288,8 +333,12 @@ class ProductivityDashboard:
 
     def exit_task_view(self):
         """Exit the scheduler view and return to the normal view."""
-        self.display_times()
+        self.queries.cancel(self)  # Drop schedule loads still in flight
+        self.end_run()  # The running schedule ends with its view
         self.schedule_name = None  # Reset the active schedule name
+        self.viewing_scheduler = False
+        self._clear_tree()  # Drop the task rows before the app rows come back
+        self.display_times()
         
         # Change the label back to "Dashboard"
         for widget in self.root.winfo_children():
@@ -373,58 +422,34 @@ class ProductivityDashboard:
         
     def update_task(self, task_id, task_type, duration):
         """Update the task in the database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        if duration is not None:
-            cursor.execute("""
-                UPDATE schedule_times
-                SET type = ?, duration = ?
-                WHERE id = ?
-            """, (task_type, duration, task_id))
-        else:
-            cursor.execute("""
-                UPDATE schedule_times
-                SET type = ?
-                WHERE id = ?
-            """, (task_type, task_id))
-        conn.commit()
-        conn.close()
+        self.storage.update_task(task_id, task_type, duration)
         self.load_selected_schedule(self.schedule_name)
 
     def get_dynamic_schedule(self, name):
         """Retrieve the dynamic schedule settings."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM schedule WHERE name = ?", (name,))
-        data = cursor.fetchone()
-        if not data:
-            conn.close()
-            return []
-
-        next_id = data[0]
-        schedule_items = []
-        while next_id:
-            cursor.execute("SELECT type, duration, id, next_id FROM schedule_times WHERE id = ?", (next_id,))
-            row = cursor.fetchone()
-            if not row:
-                break
-            schedule_items.append((row[0], row[1], row[2]))  # Append (type, duration)
-            next_id = row[3]
-        conn.close()
-        return schedule_items
+        return self.storage.schedule_items(name)
 
-    def load_selected_schedule(self, selected_schedule):
+    def load_selected_schedule(self, selected_schedule, on_loaded=None):
         """Load the selected schedule from the dropdown."""
         if selected_schedule:
             self.schedule_name = selected_schedule  # Set the active schedule name
-            self.tree.delete(*self.tree.get_children())  # Clear existing data
-            dynamic_schedule = self.get_dynamic_schedule(self.schedule_name)
-            self.schedule = dynamic_schedule
-            for slot in dynamic_schedule:
-                expected_duration = format_time(slot[1])
-                self.tree.insert('', 'end', values=(slot[0], expected_duration), tags=(slot[2],))
+            self._clear_tree()  # Clear existing data
+            self.tree.insert('', 'end', values=("Loading...", ""))
+
+            def loaded(dynamic_schedule):
+                if self.schedule_name != selected_schedule or not self.tree.winfo_exists():
+                    return  # The user picked another schedule or left the scheduler
+                self._clear_tree()
+                self.schedule = dynamic_schedule
+                for slot in dynamic_schedule:
+                    expected_duration = format_time(slot[1])
+                    self.tree.insert('', 'end', values=(slot[0], expected_duration), tags=(slot[2],))
 
-            self.tree.tag_bind('all', '<ButtonRelease-1>', self.on_task_click)
+                self.tree.tag_bind('all', '<ButtonRelease-1>', self.on_task_click)
+                if on_loaded:
+                    on_loaded()
+
+            self.queries.submit(self.get_dynamic_schedule, self.schedule_name, on_result=loaded, owner=self)
 
     def on_task_click(self, event):
         """Handle task click event to access the hidden id."""
@@ -491,82 +516,126 @@ class ProductivityDashboard:
 
             if task_name and expected_duration:
                 expected_duration = float(expected_duration) * 60
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT id FROM schedule WHERE name = ?", (self.schedule_name,))
-                schedule_id = cursor.fetchone()
-                if not schedule_id:
-                    # Insert a new schedule if it doesn't exist
-                    cursor.execute("INSERT INTO schedule_times (next_id, type, duration) VALUES (NULL, ?, ?)", (task_type, expected_duration))
-                    schedule_id = cursor.lastrowid
-                    cursor.execute("INSERT INTO schedule (name, id) VALUES (?, ?)", (self.schedule_name, schedule_id,))
-                    conn.commit()
-                else:
-                    schedule_id = schedule_id[0]
-                    has_next = True
-                    while has_next:
-                        cursor.execute("SELECT next_id FROM schedule_times WHERE id = ?", (schedule_id,))
-                        next_id = cursor.fetchone()
-                        if not next_id:
-                            has_next = False
-                        else:
-                            schedule_id = next_id[0]
-                    cursor.execute("INSERT INTO schedule_times (next_id, type, duration) VALUES (NULL, ?, ?)", (task_type, expected_duration))
-                    new_id = cursor.lastrowid
-                    cursor.execute("UPDATE schedule_times SET next_id = ? WHERE id = ?", (new_id, schedule_id))
-                    conn.commit()
-                conn.close()
+                self.storage.append_task(self.schedule_name, task_type, expected_duration)
+                self.load_selected_schedule(self.schedule_name)
                 input_window.destroy()  # Close the input window after submission
 
         # Submit button
         ctk.CTkButton(input_window, text="Submit", command=submit_task).pack(pady=10)
 
-    def remove_task(self):
-        selected_item = self.tree.focus()
-        if not selected_item:
+    def add_technique_schedule(self):
+        """Create a whole schedule from a scheduling technique in one step."""
+        dynamic_schedule = getattr(self, "dynamic_schedule", None)
+        if dynamic_schedule is None:
             return
 
-        task_id = self.tree.item(selected_item, 'tags')[0]
+        input_window = ctk.CTkToplevel(self.root)
+        input_window.title("Schedule From Technique")
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Center the window on the screen
+        input_window.update_idletasks()
+        width = 300
+        height = 360
 
-        # Find the previous task that references this task
-        cursor.execute("SELECT id FROM schedule_times WHERE next_id = ?", (task_id,))
-        previous_task = cursor.fetchone()
+        x = (self.root.winfo_width() // 2) - (width // 2)
+        y = (self.root.winfo_height() // 2) - (height // 2)
 
-        # Find the next task that this task references
-        cursor.execute("SELECT next_id FROM schedule_times WHERE id = ?", (task_id,))
-        next_task = cursor.fetchone()
+        input_window.geometry(f'{width}x{height}+{x}+{y}')
 
-        # Check if the task being deleted is the one referenced by the schedule name
-        cursor.execute("SELECT id FROM schedule WHERE name = ?", (self.schedule_name,))
-        schedule_id = cursor.fetchone()
+        # Focus on the window
+        input_window.focus_force()
+        input_window.transient(self.root)
 
-        if schedule_id and schedule_id[0] == task_id:
-            if next_task:
-                # Update the schedule to reference the next task
-                cursor.execute("UPDATE schedule SET id = ? WHERE name = ?", (next_task[0], self.schedule_name))
-            else:
-                # If there is no next task, delete the schedule
-                cursor.execute("DELETE FROM schedule WHERE name = ?", (self.schedule_name,))
+        # Schedule name input
+        ctk.CTkLabel(input_window, text="Enter schedule name:").pack(pady=5)
+        name_entry = ctk.CTkEntry(input_window)
+        name_entry.pack(pady=5)
 
-        # Delete the selected task
-        cursor.execute("DELETE FROM schedule_times WHERE id = ?", (task_id,))
+        # Technique dropdown
+        ctk.CTkLabel(input_window, text="Select Technique:").pack(pady=5)
+        technique = ctk.StringVar(value="pomodoro")
+        ctk.CTkOptionMenu(
+            input_window,
+            values=dynamic_schedule.technique_names(),
+            variable=technique
+        ).pack(pady=5)
+
+        # Repetitions input
+        ctk.CTkLabel(input_window, text="Repetitions:").pack(pady=5)
+        repetitions_entry = ctk.CTkEntry(input_window)
+        repetitions_entry.insert(0, "1")
+        repetitions_entry.pack(pady=5)
+
+        # Overwriting a schedule must be asked for explicitly
+        replace = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(input_window, text="Replace existing schedule", variable=replace).pack(pady=5)
+
+        def submit_technique():
+            schedule_name = name_entry.get().strip()
+            repetitions = repetitions_entry.get().strip()
+            if not schedule_name or not repetitions.isdigit() or int(repetitions) < 1:
+                return
+            technique_name, overwrite = technique.get(), replace.get()
+
+            def save():
+                # Runs on a query worker, off the Tk thread
+                if not overwrite and schedule_name in self.storage.schedule_names():
+                    return None
+                return dynamic_schedule.save_technique_schedule(schedule_name, technique_name, int(repetitions), overwrite)
+
+            def saved(task_count):
+                if task_count is None:
+                    show_ok_popup(self.root, f"A schedule called {schedule_name} already exists. Tick \"Replace existing schedule\" to overwrite it.", title="Schedule From Technique")
+                    return
+                if not task_count:
+                    show_ok_popup(self.root, f"No blocks are set up for the {technique_name} technique.", title="Schedule From Technique")
+                    return
+                if schedule_name not in self.schedules:
+                    self.schedules.append(schedule_name)
+                if input_window.winfo_exists():
+                    input_window.destroy()
+                    self.load_selected_schedule(schedule_name)
+
+            self.queries.submit(save, on_result=saved, owner=self)
 
-        if previous_task:
-            if next_task:
-                # Update the previous task to reference the next task
-                cursor.execute("UPDATE schedule_times SET next_id = ? WHERE id = ?", (next_task[0], previous_task[0]))
-            else:
-                # If there is no next task, set the next_id of the previous task to NULL
-                cursor.execute("UPDATE schedule_times SET next_id = NULL WHERE id = ?", (previous_task[0],))
+        # Submit button
+        ctk.CTkButton(input_window, text="Submit", command=submit_technique).pack(pady=10)
 
-        conn.commit()
-        conn.close()
+    def remove_task(self):
+        selected_item = self.tree.focus()
+        if not selected_item:
+            return
+
+        task_id = self.tree.item(selected_item, 'tags')[0]
+        self.storage.remove_task(self.schedule_name, task_id)
 
         self.load_selected_schedule(self.schedule_name)
         
+    def move_task(self, offset):
+        """Move the selected task `offset` places within the schedule."""
+        selected_item = self.tree.focus()
+        if not selected_item or not self.schedule_name or not self.schedule:
+            return
+
+        task_ids = [slot[2] for slot in self.schedule]
+        task_id = int(self.tree.item(selected_item, 'tags')[0])
+        if task_id not in task_ids:
+            return
+        index = task_ids.index(task_id)
+        target = index + offset
+        if not 0 <= target < len(task_ids):
+            return
+        task_ids[index], task_ids[target] = task_ids[target], task_ids[index]
+        self.storage.reorder_tasks(self.schedule_name, task_ids)
+
+
+        def select_moved():
+            moved_item = self.tree.get_children()[target]
+            self.tree.focus(moved_item)
+            self.tree.selection_set(moved_item)
+
+        self.load_selected_schedule(self.schedule_name, on_loaded=select_moved)
+
     def start_schedule(self):
         """Start the schedule countdown."""
         if not self.schedule:
@@ -591,45 +660,62 @@ class ProductivityDashboard:
             
             return
         
-        self.stop_distract.status = self.schedule[self.current_task_index][0]
-        self.stop_distract.changed = True
+        self.stop_distract.set_status(self.schedule[self.current_task_index][0])
 
         task_type, duration, task_id = self.schedule[self.current_task_index]
         self.current_task_index += 1
 
-        self.tree.delete(*self.tree.get_children())  # Clear existing data
+        self._clear_tree()  # Clear existing data
         self.tree.insert('', 'end', values=(task_type, format_time(duration)))
 
-        self.countdown(duration)
+        self.set_pause_text("Pause")
+        self.timer.start(duration)
 
-    def countdown(self, remaining_time):
-        """Countdown timer for the current task."""
-        if remaining_time <= 0:
-            if self.current_task_index > 0 and self.current_task_index < len(self.schedule):
-                previous_task_type = self.schedule[self.current_task_index - 1][0]
-                current_task_type = self.schedule[self.current_task_index][0]
-            else:
-                self.run_task()
-                return
+    def show_remaining(self, remaining):
+        """Show the time left in the current task, rounded up to whole seconds."""
+        rows = self.tree.get_children() if self.tree and self.tree.winfo_exists() else ()
+        if rows:
+            self.tree.item(rows[0], values=(self.tree.item(rows[0], 'values')[0], format_time(math.ceil(remaining))))
 
-            # Display the appropriate message
-            if previous_task_type == "NONPRODUCTIVE" and current_task_type == "PRODUCTIVE":
-                message = "Time to get to work!"
-            elif previous_task_type == "PRODUCTIVE" and current_task_type == "NONPRODUCTIVE":
-                message = "Time to get some rest!"
-            else:
-                message = "Task transition"
+    def task_complete(self):
+        """Announce the end of the current task and move to the next one."""
+        if self.current_task_index > 0 and self.current_task_index < len(self.schedule):
+            previous_task_type = self.schedule[self.current_task_index - 1][0]
+            current_task_type = self.schedule[self.current_task_index][0]
+        else:
+            self.run_task()
+            return
 
-            # Wait for the user to click the OK button before continuing
-            show_ok_popup(self.root, message, title="Task Complete", ok_text="Next Task")
-            self.run_task()  # Move to the next task
+        # Display the appropriate message
+        if previous_task_type == "NONPRODUCTIVE" and current_task_type == "PRODUCTIVE":
+            message = "Time to get to work!"
+        elif previous_task_type == "PRODUCTIVE" and current_task_type == "NONPRODUCTIVE":
+            message = "Time to get some rest!"
+        else:
+            message = "Task transition"
+
+        # Wait for the user to click the OK button before continuing
+        show_ok_popup(self.root, message, title="Task Complete", ok_text="Next Task")
+        self.run_task()  # Move to the next task
+
+    def toggle_pause(self):
+        """Pause or resume the running task; the time spent paused is added to its deadline."""
+        if not self.timer.active:
             return
+        if self.timer.paused:
+            self.timer.resume()
+            self.set_pause_text("Pause")
+        else:
+            self.timer.pause()
+            self.set_pause_text("Resume")
 
-        self.tree.item(self.tree.get_children()[0], values=(self.tree.item(self.tree.get_children()[0], 'values')[0], format_time(remaining_time)))
-        self.update_job = self.root.after(1000, self.countdown, remaining_time - 1)
+    def set_pause_text(self, text):
+        pause_button = getattr(self, "pause_button", None)
+        if pause_button is not None and pause_button.winfo_exists():
+            pause_button.configure(text=text)
 
     def finish_task_early(self):
         """Finish the current task early and move to the next one."""
-        if self.update_job:
-            self.root.after_cancel(self.update_job)
+        if self.timer.active:
+            self.timer.cancel()
             self.run_task()
\ No newline at end of file
@@ -0,0 +1,86 @@
+# clock/deadline_timer.py
+import math
+import time
+
+class DeadlineTimer:
+    """Counts down to an absolute deadline on a monotonic clock using Tk's after.
+
+    The remaining time is recomputed from the deadline on every tick, so late callbacks
+    never add drift: ticks missed while the Tk thread was busy collapse into one.
+    `on_tick(remaining)` runs whenever the whole seconds left change and `on_expire()`
+    once the deadline has passed. `clock` can be swapped for a fake in checks.
+    """
+
+    def __init__(self, root, on_tick, on_expire, clock=time.monotonic):
+        self.root = root
+        self.on_tick = on_tick
+        self.on_expire = on_expire
+        self.clock = clock
+        self.deadline = None  # Clock time the current run ends at, None when idle
+        self.paused_remaining = None  # Seconds left while paused
+        self.job = None
+
+    @property
+    def active(self):
+        """True while a run is counting down or paused."""
+        return self.deadline is not None or self.paused_remaining is not None
+
+    @property
+    def paused(self):
+        return self.paused_remaining is not None
+
+    def start(self, duration):
+        """Start counting down `duration` seconds, replacing any current run."""
+        self.cancel()
+        self.deadline = self.clock() + duration
+        self._tick()
+
+    def remaining(self):
+        """Seconds left in the current run (0 when idle)."""
+        if self.paused_remaining is not None:
+            return self.paused_remaining
+        if self.deadline is None:
+            return 0
+        return max(0, self.deadline - self.clock())
+
+    def pause(self):
+        """Freeze the countdown; resume moves the deadline by the time spent paused."""
+        if self.deadline is None:
+            return
+        self.paused_remaining = self.remaining()
+        self.deadline = None
+        self._cancel_job()
+
+    def resume(self):
+        if self.paused_remaining is None:
+            return
+        self.deadline = self.clock() + self.paused_remaining
+        self.paused_remaining = None
+        self._tick()
+
+    def cancel(self):
+        """Stop the current run without calling on_expire."""
+        self._cancel_job()
+        self.deadline = None
+        self.paused_remaining = None
+
+    def _cancel_job(self):
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+
+    def _tick(self):
+        self.job = None
+        if self.deadline is None:
+            return
+        remaining = self.deadline - self.clock()
+        if remaining <= 0:
+            self.deadline = None
+            self.on_expire()
+            return
+        self.on_tick(remaining)
+        if self.deadline is None:
+            return  # on_tick cancelled or paused the run
+        # Wake when the whole seconds shown next change, not a fixed second from now
+        until_next = remaining - math.ceil(remaining) + 1
+        self.job = self.root.after(max(1, math.ceil(until_next * 1000)), self._tick)
@@ -1,25 +1,103 @@
 import openai
 from dotenv import load_dotenv
+import json
 import os
+import time
+from threading import Lock
+
+CATEGORIES = ("PRODUCTIVE", "NONPRODUCTIVE")
+UNKNOWN = "UNKNOWN"
 
 class DetectDistraction:
-    
-    def __init__(self):
+
+    def __init__(self, api_base=None, timeout=10, retries=3, backoff=0.5, batch_size=50, failure_threshold=3, reset_after=60):
         load_dotenv()  # Automatically finds the .env file
         self.api_key = os.getenv('OPENAI_API_KEY')
         openai.api_key = self.api_key
-        
+        self.api_base = api_base or os.getenv('CLASSIFIER_API_BASE')  # e.g. a FakeClassifierServer url
+        self.timeout = timeout  # Seconds per request
+        self.retries = retries
+        self.backoff = backoff  # Initial delay between retries, doubled each attempt
+        self.batch_size = batch_size  # App names packed into one request
+        self.failure_threshold = failure_threshold  # Consecutive failed batches before the breaker opens
+        self.reset_after = reset_after  # Seconds the breaker stays open before trying again
+        self.failures = 0
+        self.opened_at = None
+        self.breaker_lock = Lock()  # Guards failures and opened_at; classify_many runs on several workers
+
     def classify(self, app_name):
+        return self.classify_many([app_name])[app_name]
+
+    def classify_many(self, names):
+        """Classify many app names or domains, packing up to batch_size into each request."""
+        names = list(dict.fromkeys(names))
+        results = {}
+        for i in range(0, len(names), self.batch_size):
+            batch = names[i:i + self.batch_size]
+            results.update(self._classify_batch(batch))
+        return results
+
+    def _classify_batch(self, names):
+        """Send one request for `names`, falling back to UNKNOWN when the endpoint is failing."""
+        if self._breaker_open():
+            return {name: UNKNOWN for name in names}
+        delay = self.backoff
+        for attempt in range(self.retries):
+            try:
+                results = self._parse(self._request(names), names)
+                with self.breaker_lock:
+                    self.failures = 0
+                    self.opened_at = None
+                return results
+            except Exception as e:
+                print(f"Error classifying applications (attempt {attempt + 1}): {e}")
+                if attempt + 1 < self.retries:
+                    time.sleep(delay)
+                    delay *= 2
+        with self.breaker_lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+        return {name: UNKNOWN for name in names}
+
+    def _breaker_open(self):
+        with self.breaker_lock:
+            if self.opened_at is None:
+                return False
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                # Half-open: this batch probes the endpoint while the others still see the breaker open
+                self.opened_at = time.monotonic()
+                self.failures = self.failure_threshold - 1
+                return False
+            return True
+
+    def _request(self, names):
+        kwargs = {"request_timeout": self.timeout}
+        if self.api_base:
+            kwargs["api_base"] = self.api_base
         response = openai.ChatCompletion.create(
             model="gpt-3.5-turbo",
             messages=[
-            {"role": "system", "content": "Respond with one of two words, PRODUCTIVE and NONPRODUCTIVE depending on the application provided, for example programming IDE's are PRODUCTIVE."},
-            {"role": "user", "content": f"Application name: {app_name}\nResponse:"}
+            {"role": "system", "content": "Classify each application or website as PRODUCTIVE or NONPRODUCTIVE, for example programming IDE's are PRODUCTIVE. Respond only with a JSON object mapping every name to its category."},
+            {"role": "user", "content": f"Applications: {json.dumps(names)}\nResponse:"}
             ],
-            max_tokens=10,  # Increased max_tokens to capture the full response
+            max_tokens=20 * len(names) + 20,
             n=1,
             stop=None,
-            temperature=0
+            temperature=0,
+            **kwargs
         )
 
-        return response.choices[0].message['content'].strip()
\ No newline at end of file
+        return response.choices[0].message['content'].strip()
+
+    def _parse(self, content, names):
+        """Parse the JSON object in `content` into {name: category}."""
+        start, end = content.find("{"), content.rfind("}")
+        if start == -1 or end == -1:
+            raise ValueError(f"Unexpected classification response: {content!r}")
+        data = json.loads(content[start:end + 1])
+        results = {}
+        for name in names:
+            category = str(data.get(name, UNKNOWN)).strip().upper()
+            results[name] = category if category in CATEGORIES else UNKNOWN
+        return results
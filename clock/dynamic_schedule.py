@@ -1,13 +1,110 @@
 import json
+import sqlite3
 import time
-from datetime import datetime, timedelta
+from threading import Event
+from scheduler import TickScheduler
+from storage import Storage
+
+PRODUCTIVE = "PRODUCTIVE"
+NONPRODUCTIVE = "NONPRODUCTIVE"
+MIN_RUNS = 3  # Runs of a task before its learned duration replaces the configured one
+MIN_DURATION = 5 * 60  # Shortest proposed block, in seconds
+
+class Block:
+    """One timed block of a schedule run; `task_type` is PRODUCTIVE or NONPRODUCTIVE like schedule tasks."""
+
+    def __init__(self, name, task_type, duration):
+        self.name = name
+        self.type = task_type
+        self.duration = duration  # Seconds
+
+class ScheduleRun:
+    """Handle for a schedule started with DynamicSchedule.run.
+
+    The run's state is owned by the engine's scheduler thread; the control methods
+    hand the change over to it, so they may be called from any thread.
+    """
+
+    def __init__(self, engine, run_id, name, blocks, remind_before):
+        self.engine = engine
+        self.id = run_id
+        self.name = name
+        self.blocks = blocks
+        self.remind_before = remind_before  # Seconds before a block ends to emit "reminder", or None
+        self.state = "pending"  # pending, running, paused, cancelled or finished
+        self.index = -1  # Index of the current block
+        self.deadline = None  # Monotonic time the current block ends at while running
+        self.paused_remaining = None  # Seconds left in the current block while paused
+        self.elapsed = 0  # Seconds the current block has run, excluding pauses
+        self.resumed_at = None  # Monotonic time the current block last started or resumed
+        self.job = None  # End of the current block
+        self.reminder_job = None
+        self.overdue = False  # Past its deadline and waiting for advance to confirm the end
+
+    @property
+    def block(self):
+        return self.blocks[self.index] if 0 <= self.index < len(self.blocks) else None
+
+    @property
+    def active(self):
+        return self.state in ("pending", "running", "paused")
+
+    def remaining(self):
+        """Seconds left in the current block."""
+        if self.state == "paused":
+            return self.paused_remaining
+        if self.state != "running":
+            return 0
+        return max(0, self.deadline - time.monotonic())
+
+    def pause(self):
+        self.engine.scheduler.call_soon(self.engine._pause, self)
+
+    def resume(self):
+        self.engine.scheduler.call_soon(self.engine._resume, self)
+
+    def cancel(self):
+        self.engine.scheduler.call_soon(self.engine._cancel, self)
+
+    def skip(self):
+        """Drop the current block without logging it and start the next one (running, even if paused)."""
+        self.engine.scheduler.call_soon(self.engine._skip, self)
+
+    def finish(self):
+        """The work of the current block is done early: log its length so far and start the next one."""
+        self.engine.scheduler.call_soon(self.engine._finish, self)
+
+    def advance(self):
+        """Confirm that an overdue block has ended and start the next one."""
+        self.engine.scheduler.call_soon(self.engine._advance, self)
 
 class DynamicSchedule:
-    def __init__(self, settings_file='settings.json'):
+    """Runs focus techniques as timed blocks on a TickScheduler instead of sleeping through them.
+
+    Every block end and reminder is a one-shot scheduler job, so any number of runs can be
+    active at once and each can be paused, resumed, skipped or cancelled. Listeners added
+    with subscribe are called on the scheduler thread with (event, run) for the events
+    "started", "block_started", "reminder", "block_ended", "skipped", "paused", "resumed",
+    "cancelled" and "finished"; the current block is `run.block`.
+
+    With `confirm_transitions`, a block that reaches its deadline emits "block_due" and the
+    next block only starts once `run.advance()` confirms the user is back. With a `db_path`,
+    every block that ends at its deadline or through `run.finish()` is logged to task_runs
+    with the time worked on it (never the wait for the confirmation, nor pauses), and block
+    lengths are proposed from the learned per-task estimates; skipped and cancelled blocks
+    are not logged.
+    """
+
+    def __init__(self, settings_file='settings.json', scheduler=None, db_path=None, confirm_transitions=False):
         self.settings_file = settings_file
+        self.confirm_transitions = confirm_transitions
         self.load_settings()
-        self.current_task = None
-        self.start_time = None
+        self.storage = Storage.open(db_path) if db_path else None
+        self.own_scheduler = scheduler is None
+        self.scheduler = scheduler or TickScheduler("dynamic-schedule")
+        self.listeners = []
+        self.runs = {}  # {run id: ScheduleRun} for the active runs
+        self.next_run_id = 1
 
     def load_settings(self):
         try:
@@ -21,76 +118,290 @@ class DynamicSchedule:
         with open(self.settings_file, 'w') as file:
             json.dump(self.settings, file, indent=4)
 
-    def start_task(self, task_name):
-        self.current_task = task_name
-        self.start_time = datetime.now()
-        print(f"Started task: {task_name} at {self.start_time}")
-
-    def end_task(self):
-        if self.current_task:
-            end_time = datetime.now()
-            duration = end_time - self.start_time
-            print(f"Ended task: {self.current_task} at {end_time}, duration: {duration}")
-            self.adjust_schedule(duration)
-            self.current_task = None
-            self.start_time = None
-
-    def adjust_schedule(self, duration):
-        task_settings = self.settings.get('tasks', {}).get(self.current_task, {})
-        if task_settings:
-            expected_duration = timedelta(minutes=task_settings.get('expected_duration', 25))
-            if duration > expected_duration:
-                task_settings['expected_duration'] += 5
-            elif duration < expected_duration:
-                task_settings['expected_duration'] = max(5, task_settings['expected_duration'] - 5)
-            self.save_settings()
+    def subscribe(self, listener):
+        """Call listener(event, run) on the scheduler thread for every schedule event."""
+        self.listeners.append(listener)
+
+    def run(self, name, blocks, remind_before=None):
+        """Start running `blocks` in order and return the ScheduleRun controlling them."""
+        run = ScheduleRun(self, self.next_run_id, name, list(blocks), remind_before)
+        self.next_run_id += 1
+        if self.own_scheduler:
+            self.scheduler.start()
+        self.scheduler.call_soon(self._start, run)
+        return run
+
+    def active_runs(self):
+        return list(self.runs.values())
+
+    def close(self):
+        """Cancel every run and stop the scheduler if this engine created it."""
+        for run in self.active_runs():
+            self.scheduler.call_and_wait(self._cancel, run)
+        if self.own_scheduler:
+            self.scheduler.stop()
+
+    def proposed_duration(self, task_name, default):
+        """Seconds to plan for `task_name`: the learned typical length once it has MIN_RUNS runs, else `default`.
+
+        The moving average follows recent runs; capping it at the 90th percentile keeps one
+        overlong run from stretching the next block.
+        """
+        if self.storage is None:
+            return default
+        try:
+            estimate = self.storage.task_estimate(task_name)
+        except sqlite3.Error as e:
+            print(f"Error reading the duration estimate of {task_name}: {e}")
+            return default
+        if estimate is None or estimate[0] < MIN_RUNS:
+            return default
+        _, ewma, _, p90 = estimate
+        return max(MIN_DURATION, round(min(ewma, p90) / 60) * 60)
+
+    def block(self, name, task_type, minutes):
+        """A Block of `minutes` configured minutes, or of the length learned for `name`."""
+        return Block(name, task_type, self.proposed_duration(name, minutes * 60))
+
+    def start_technique(self, technique_name):
+        """Start a technique by the name used in the settings view."""
+        if technique_name == "pomodoro":
+            return self.pomodoro()
+        if technique_name == "eat the frog":
+            return self.eat_the_frog()
+        return self.custom_technique(technique_name)
+
+    def technique_names(self):
+        """Names accepted by start_technique and compile_technique."""
+        names = ["pomodoro", "eat the frog"]
+        names += [name for name in self.settings.get('techniques', {}) if name not in names]
+        return names if "custom" in names else names + ["custom"]
+
+    def technique_blocks(self, technique_name):
+        """Expand one cycle of a technique into Blocks, or None if it is not set up."""
+        if technique_name == "pomodoro":
+            return self.pomodoro_blocks()
+        if technique_name == "eat the frog":
+            return self.eat_the_frog_blocks()
+        technique = self.settings.get('techniques', {}).get(technique_name, {})
+        if technique:
+            return self.time_blocks(technique.get('blocks', []))
+        return None
+
+    def compile_technique(self, technique_name, repetitions=1):
+        """Return the (type, duration) schedule tasks of `repetitions` cycles of a technique, or None."""
+        self.load_settings()  # The settings view may have changed the file since
+        blocks = self.technique_blocks(technique_name)
+        if not blocks:
+            return None
+        return [(block.type, block.duration) for block in blocks] * repetitions
+
+    def save_technique_schedule(self, schedule_name, technique_name, repetitions=1, replace=False):
+        """Write a technique as the schedule called `schedule_name`. Returns the task count, 0 if nothing was written.
+
+        An existing schedule of that name is only overwritten with `replace`.
+        """
+        if self.storage is None:
+            return 0  # Nowhere to write it
+        tasks = self.compile_technique(technique_name, repetitions)
+        if not tasks or not self.storage.write_schedule(schedule_name, tasks, replace):
+            return 0
+        return len(tasks)
 
     def pomodoro(self):
         technique = self.settings.get('techniques', {}).get('pomodoro', {})
-        focus_duration = technique.get('focus_duration', 25)
-        short_break = technique.get('short_break', 5)
-        long_break = technique.get('long_break', 15)
-        long_break_interval = technique.get('long_break_interval', 4)
+        return self.run('pomodoro', self.pomodoro_blocks(), self._reminder(technique))
 
+    def pomodoro_blocks(self):
+        # The top-level fields are the ones the settings file ships with
+        technique = self.settings.get('techniques', {}).get('pomodoro', {})
+        focus_duration = technique.get('focus_duration', self.settings.get('pomodoro_timer', 25))
+        short_break = technique.get('short_break', self.settings.get('short_break', 5))
+        long_break = technique.get('long_break', self.settings.get('long_break', 15))
+        long_break_interval = technique.get('long_break_interval', self.settings.get('long_break_interval', 4))
+
+        blocks = []
         for i in range(long_break_interval):
-            self.start_task('Pomodoro')
-            time.sleep(focus_duration * 60)
-            self.end_task()
-            print(f"Take a {short_break}-minute break.")
-            time.sleep(short_break * 60)
-        
-        print(f"Take a {long_break}-minute break.")
-        time.sleep(long_break * 60)
+            blocks.append(self.block('Pomodoro', PRODUCTIVE, focus_duration))
+            blocks.append(self.block('Short Break', NONPRODUCTIVE, short_break))
+        blocks.append(self.block('Long Break', NONPRODUCTIVE, long_break))
+        return blocks
 
     def custom_technique(self, technique_name):
         technique = self.settings.get('techniques', {}).get(technique_name, {})
         if technique:
-            for block in technique.get('blocks', []):
-                self.start_task(block['name'])
-                time.sleep(block['duration'] * 60)
-                self.end_task()
-                if 'break' in block:
-                    print(f"Take a {block['break']} minute break.")
-                    time.sleep(block['break'] * 60)
+            return self.time_blocking(technique.get('blocks', []), name=technique_name, remind_before=self._reminder(technique))
+        return None
 
     def eat_the_frog(self):
-        self.start_task('Eat the Frog')
-        time.sleep(60 * 60)  # 1 hour
-        self.end_task()
-        print("Take a 10-minute break.")
-        time.sleep(10 * 60)  # 10 minutes
+        return self.run('eat the frog', self.eat_the_frog_blocks())
+
+    def eat_the_frog_blocks(self):
+        return [self.block('Eat the Frog', PRODUCTIVE, 60), self.block('Break', NONPRODUCTIVE, 10)]
+
+    def time_blocking(self, blocks, name='time blocking', remind_before=None):
+        return self.run(name, self.time_blocks(blocks), remind_before)
 
-    def time_blocking(self, blocks):
+    def time_blocks(self, blocks):
+        timed = []
         for block in blocks:
-            self.start_task(block['name'])
-            time.sleep(block['duration'] * 60)
-            self.end_task()
+            timed.append(self.block(block['name'], PRODUCTIVE, block['duration']))
             if 'break' in block:
-                print(f"Take a {block['break']} minute break.")
-                time.sleep(block['break'] * 60)
+                timed.append(self.block('Break', NONPRODUCTIVE, block['break']))
+        return timed
+
+    def _reminder(self, technique):
+        minutes = technique.get('reminder')
+        return minutes * 60 if minutes else None
+
+    # Everything below runs on the scheduler thread
+
+    def _emit(self, event, run):
+        for listener in self.listeners:
+            try:
+                listener(event, run)
+            except Exception as e:
+                print(f"Error in schedule listener for {event}: {e}")
+
+    def _start(self, run):
+        if run.state != "pending":
+            return  # Cancelled before it started
+        self.runs[run.id] = run
+        run.state = "running"
+        self._emit("started", run)
+        self._enter(run, 0, time.monotonic())
+
+    def _enter(self, run, index, start):
+        """Start block `index` at monotonic time `start`, or finish the run after the last block."""
+        if index >= len(run.blocks):
+            run.state = "finished"
+            run.index = len(run.blocks)
+            self.runs.pop(run.id, None)
+            self._emit("finished", run)
+            return
+        run.index = index
+        run.elapsed = 0
+        run.overdue = False
+        run.resumed_at = start
+        # Chained from the previous deadline, so a late wake-up does not push later blocks back
+        run.deadline = start + run.blocks[index].duration
+        self._arm(run)
+        self._emit("block_started", run)
+
+    def _arm(self, run):
+        now = time.monotonic()
+        run.job = self.scheduler.call_later(run.deadline - now, self._block_due, run, run.index)
+        if run.remind_before and run.deadline - run.remind_before > now:
+            run.reminder_job = self.scheduler.call_later(run.deadline - run.remind_before - now, self._remind, run, run.index)
+
+    def _disarm(self, run):
+        for job in (run.job, run.reminder_job):
+            if job:
+                job.cancel()
+        run.job = run.reminder_job = None
+
+    def _end_block(self, run, end, record=True):
+        """End the current block at monotonic time `end`, logging its actual length when `record` is set."""
+        block = run.block
+        if run.state == "running":
+            run.elapsed += end - run.resumed_at
+        if record and self.storage is not None:
+            try:
+                self.storage.record_task_run(block.name, block.duration, run.elapsed)
+            except sqlite3.Error as e:
+                print(f"Error recording the run of {block.name}: {e}")
+
+    def _block_due(self, run, index):
+        if run.state != "running" or run.index != index:
+            return
+        run.job = None
+        self._end_block(run, run.deadline)  # The work ends at the deadline, however late the confirmation
+        if self.confirm_transitions:
+            run.overdue = True  # Waits for advance before starting the next block
+            self._emit("block_due", run)
+            return
+        self._emit("block_ended", run)
+        self._enter(run, index + 1, run.deadline)
+
+    def _advance(self, run):
+        if run.state != "running" or not run.overdue:
+            return
+        self._emit("block_ended", run)
+        self._enter(run, run.index + 1, time.monotonic())
+
+    def _finish(self, run):
+        if run.overdue:
+            self._advance(run)  # Already ended and logged at its deadline
+            return
+        if run.state not in ("running", "paused"):
+            return
+        now = time.monotonic()
+        self._disarm(run)
+        self._end_block(run, now)
+        run.state = "running"
+        run.paused_remaining = None
+        self._emit("block_ended", run)
+        self._enter(run, run.index + 1, now)
+
+    def _remind(self, run, index):
+        if run.state == "running" and run.index == index:
+            run.reminder_job = None
+            self._emit("reminder", run)
+
+    def _pause(self, run):
+        if run.state != "running" or run.overdue:
+            return
+        now = time.monotonic()
+        self._disarm(run)
+        run.elapsed += now - run.resumed_at
+        run.paused_remaining = max(0, run.deadline - now)
+        run.deadline = None
+        run.state = "paused"
+        self._emit("paused", run)
+
+    def _resume(self, run):
+        if run.state != "paused":
+            return
+        now = time.monotonic()
+        run.deadline = now + run.paused_remaining
+        run.resumed_at = now
+        run.paused_remaining = None
+        run.state = "running"
+        self._arm(run)
+        self._emit("resumed", run)
+
+    def _skip(self, run):
+        if run.overdue:
+            self._advance(run)
+            return
+        if run.state not in ("running", "paused"):
+            return
+        now = time.monotonic()
+        self._disarm(run)
+        self._end_block(run, now, record=False)
+        run.state = "running"
+        run.paused_remaining = None
+        run.overdue = False
+        self._emit("skipped", run)
+        self._enter(run, run.index + 1, now)
+
+    def _cancel(self, run):
+        if not run.active:
+            return
+        self._disarm(run)
+        run.state = "cancelled"
+        run.overdue = False
+        run.deadline = run.paused_remaining = None
+        self.runs.pop(run.id, None)
+        self._emit("cancelled", run)
 
 if __name__ == "__main__":
     scheduler = DynamicSchedule()
+    done = Event()
+    scheduler.subscribe(lambda event, run: print(f"{event}: {run.block.name if run.block else run.name}"))
+    scheduler.subscribe(lambda event, run: event in ("finished", "cancelled") and done.set())
     scheduler.pomodoro()
     # Example of using a custom technique
-    # scheduler.custom_technique('CustomTechniqueName')
\ No newline at end of file
+    # scheduler.custom_technique('CustomTechniqueName')
+    done.wait()
+    scheduler.close()
@@ -0,0 +1,95 @@
+# clock/fake_classifier.py
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+DEFAULT_KEYWORDS = ["youtube", "netflix", "reddit", "twitch", "steam", "facebook", "instagram", "tiktok", "twitter", "game"]
+
+class FakeClassifierServer:
+    """Local stand-in for the chat completions endpoint used by DetectDistraction.
+
+    Point DetectDistraction(api_base=server.url) or CLASSIFIER_API_BASE at it to
+    measure batch throughput and failure handling without network access.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, failure_rate=0.0, keywords=None):
+        self.latency = latency  # Seconds added to every response
+        self.failure_rate = failure_rate  # Fraction of requests answered with HTTP 503
+        self.keywords = keywords or DEFAULT_KEYWORDS  # Names containing these are NONPRODUCTIVE
+        self.requests = 0
+        self.classified = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self.thread = Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def classify(self, name):
+        lowered = name.lower()
+        return "NONPRODUCTIVE" if any(keyword in lowered for keyword in self.keywords) else "PRODUCTIVE"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                server.requests += 1
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if server.latency:
+                    time.sleep(server.latency)
+                if random.random() < server.failure_rate:
+                    self._send(503, {"error": {"message": "Service unavailable", "type": "server_error"}})
+                    return
+                prompt = body.get("messages", [{}])[-1].get("content", "")
+                start, end = prompt.find("["), prompt.rfind("]")
+                names = json.loads(prompt[start:end + 1]) if start != -1 and end != -1 else []
+                server.classified += len(names)
+                content = json.dumps({name: server.classify(name) for name in names})
+                self._send(200, {
+                    "id": f"fake-{server.requests}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "fake"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the classification endpoint.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = FakeClassifierServer(port=args.port, latency=args.latency, failure_rate=args.failure_rate)
+    print(f"Fake classifier listening on {server.url}")
+    server.httpd.serve_forever()
+
+if __name__ == "__main__":
+    main()
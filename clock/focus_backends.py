@@ -0,0 +1,232 @@
+# clock/focus_backends.py
+import json
+import os
+import platform
+import subprocess
+import time
+
+class FocusBackend:
+    """Platform hooks used by AppMonitor to read and act on the focused window."""
+
+    browsers = []  # Substrings of app names that identify a browser
+
+    def get_focused_app(self):
+        """Return the name of the focused application, or None."""
+        return None
+
+    def get_browser(self, app_name):
+        """Return the browser name if `app_name` is a browser window, else None."""
+        if not app_name:
+            return None
+        return next((browser for browser in self.browsers if browser in app_name), None)
+
+    def get_browser_url(self, browser_name):
+        """Return the URL shown by `browser_name`, or None."""
+        return None
+
+    def minimize_window(self, app_name):
+        """Minimize the focused window of `app_name`."""
+
+class WindowsBackend(FocusBackend):
+    browsers = ["Chrome", "Edge"]
+
+    def __init__(self):
+        import win32gui
+        import uiautomation as auto
+        self.win32gui = win32gui
+        self.auto = auto
+
+    def get_focused_app(self):
+        hwnd = self.win32gui.GetForegroundWindow()
+        return self.win32gui.GetWindowText(hwnd) or None
+
+    def _find_address_bar(self, window):
+        """Find the address bar control by traversing the window's UI hierarchy."""
+        try:
+            # Traverse through child elements
+            for control in window.GetChildren():
+                if control.ControlTypeName == "Edit" or "address" in control.Name.lower() or "url" in control.Name.lower():
+                    return control.GetValuePattern().Value
+                # Recursively search child controls
+                sub_result = self._find_address_bar(control)
+                if sub_result:
+                    return sub_result
+        except Exception:
+            return None  # Suppress errors and return None
+        return None
+
+    def get_browser_url(self, browser_name):
+        """Fetch the URL from the browser's address bar."""
+        try:
+            # Get the foreground window control
+            with self.auto.UIAutomationInitializerInThread():
+                window = self.auto.GetForegroundControl()
+            if not window:
+                return None
+
+            # Check if the window is a browser
+            if "chrome" in window.Name.lower() or "edge" in window.Name.lower():
+                return self._find_address_bar(window) or None
+
+            return None
+        except Exception as e:
+            print(f"Error fetching browser URL: {e}")
+            return None
+
+    def minimize_window(self, app_name):
+        hwnd = self.win32gui.GetForegroundWindow()
+        self.win32gui.ShowWindow(hwnd, 6)  # Minimize the window
+
+class MacBackend(FocusBackend):
+    browsers = ["Google Chrome", "Safari"]
+
+    def __init__(self):
+        from AppKit import NSWorkspace
+        self.workspace = NSWorkspace.sharedWorkspace()
+
+    def get_focused_app(self):
+        return self.workspace.frontmostApplication().localizedName()
+
+    def get_browser_url(self, browser_name="Google Chrome"):
+        """Fetch the URL from the specified browser on macOS."""
+        try:
+            script = f"""
+            tell application "{browser_name}"
+                if (count of windows) > 0 then
+                    return URL of {"current tab of front window" if browser_name in ["Safari", "Firefox"] else "active tab of front window"}
+                else
+                    return ""
+                end if
+            end tell
+            """
+            url = os.popen(f"osascript -e '{script}'").read().strip()
+            return url if url else None  # Return None if no URL is found
+        except Exception as e:
+            print(f"Error fetching URL from {browser_name}: {e}")
+            return None
+
+    def minimize_window(self, app_name):
+        os.system(f"osascript -e 'tell application \"{app_name}\" to set miniaturized of front window to true'")
+
+class LinuxBackend(FocusBackend):
+    """X11 backend: reads _NET_ACTIVE_WINDOW and names the app from /proc/<pid>/comm.
+
+    Uses python-xlib when it is installed and falls back to the xprop and xdotool
+    command line tools otherwise, so it also works under Xvfb.
+    """
+
+    browsers = ["chrome", "chromium", "firefox", "brave"]
+
+    def __init__(self):
+        try:
+            from Xlib import X, display
+            self.X = X
+            self.display = display.Display()
+            self.root = self.display.screen().root
+            self.NET_ACTIVE_WINDOW = self.display.intern_atom("_NET_ACTIVE_WINDOW")
+            self.NET_WM_PID = self.display.intern_atom("_NET_WM_PID")
+        except Exception:
+            self.display = None
+
+    def get_active_window(self):
+        """Return the X window id of the active window, or None."""
+        if self.display:
+            prop = self.root.get_full_property(self.NET_ACTIVE_WINDOW, self.X.AnyPropertyType)
+            return prop.value[0] if prop and prop.value[0] else None
+        output = self._run(["xprop", "-root", "_NET_ACTIVE_WINDOW"])
+        if not output or "#" not in output:
+            return None
+        window_id = int(output.rsplit("#", 1)[1].split(",")[0].strip(), 16)
+        return window_id or None
+
+    def get_window_pid(self, window_id):
+        if self.display:
+            window = self.display.create_resource_object("window", window_id)
+            prop = window.get_full_property(self.NET_WM_PID, self.X.AnyPropertyType)
+            return prop.value[0] if prop else None
+        output = self._run(["xprop", "-id", str(window_id), "_NET_WM_PID"])
+        if not output or "=" not in output:
+            return None
+        return int(output.rsplit("=", 1)[1].strip())
+
+    def get_focused_app(self):
+        window_id = self.get_active_window()
+        if not window_id:
+            return None
+        pid = self.get_window_pid(window_id)
+        if not pid:
+            return None
+        try:
+            with open(f"/proc/{pid}/comm") as comm:
+                return comm.read().strip() or None
+        except OSError:
+            return None
+
+    def minimize_window(self, app_name):
+        window_id = self.get_active_window()
+        if window_id:
+            self._run(["xdotool", "windowminimize", str(window_id)])
+
+    def _run(self, command):
+        try:
+            return subprocess.run(command, capture_output=True, text=True, timeout=2).stdout
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+class SyntheticBackend(FocusBackend):
+    """Replays a scripted focus sequence for load-testing the monitor and storage path.
+
+    `script` is a list of (app_name, seconds) steps; `speed` divides every step so
+    a day of focus changes can be replayed in seconds. Without a script, the JSON file
+    named by SMART_CLOCK_SYNTHETIC_SCRIPT is replayed, or else DEFAULT_SCRIPT.
+    """
+
+    browsers = ["Browser"]
+    DEFAULT_SCRIPT = [("Code", 1500), ("Browser", 300), ("Terminal", 600), ("Slack", 120)]
+
+    def __init__(self, script=None, speed=1.0, loop=True, urls=None):
+        self.script = list(script or self._load_script(os.getenv("SMART_CLOCK_SYNTHETIC_SCRIPT")))
+        self.speed = speed
+        self.loop = loop
+        self.urls = urls or {}  # {browser_name: url} returned by get_browser_url
+        self.cycle = sum(seconds for _, seconds in self.script) / speed
+        self.started = time.monotonic()
+        self.minimized = []  # App names passed to minimize_window
+
+    def _load_script(self, path):
+        """Read [[app_name, seconds], ...] from `path`, falling back to DEFAULT_SCRIPT."""
+        if not path:
+            return self.DEFAULT_SCRIPT
+        try:
+            with open(path) as script_file:
+                return [(app_name, seconds) for app_name, seconds in json.load(script_file)]
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error loading synthetic focus script: {e}")
+            return self.DEFAULT_SCRIPT
+
+    def get_focused_app(self):
+        elapsed = time.monotonic() - self.started
+        if self.loop and self.cycle:
+            elapsed %= self.cycle
+        for app_name, seconds in self.script:
+            elapsed -= seconds / self.speed
+            if elapsed < 0:
+                return app_name
+        return None
+
+    def get_browser_url(self, browser_name):
+        return self.urls.get(browser_name)
+
+    def minimize_window(self, app_name):
+        self.minimized.append(app_name)
+
+BACKENDS = {"Windows": WindowsBackend, "Darwin": MacBackend, "Linux": LinuxBackend, "Synthetic": SyntheticBackend}
+
+def get_backend(name=None):
+    """Create the focus backend for `name`, SMART_CLOCK_BACKEND or the current platform."""
+    name = name or os.getenv("SMART_CLOCK_BACKEND") or platform.system()
+    backend = BACKENDS.get(name)
+    if backend is None:
+        print(f"No focus backend for {name}, focus tracking is disabled.")
+        return FocusBackend()
+    return backend()
@@ -7,9 +7,12 @@ from focus_mode import FocusMode
 from app_monitor import AppMonitor
 from settings import Settings
 from calendar_view import CalendarView
-import sqlite3
+from storage import Storage
+from query_dispatcher import QueryDispatcher
 import platform
 from stop_distract import StopDistract
+from dynamic_schedule import DynamicSchedule
+from utils import show_ok_popup
 
 class SmartClockApp:
     def __init__(self, root):
@@ -23,20 +26,29 @@ class SmartClockApp:
             self.db_path = os.path.join(os.path.dirname(__file__), '../db/usage_data.db')
         elif platform.system() == "Darwin":
             self.db_path = os.path.expanduser("~/Library/Application Support/SmartClock/db/usage_data.db")
+        else:
+            self.db_path = os.path.expanduser("~/.local/share/SmartClock/db/usage_data.db")
         self.settings = Settings()
-        self.app_monitor = AppMonitor(self.db_path, afk_threshold=self.settings.get("afk_threshold"))
+        self.storage = Storage.open(self.db_path)
+        self._setup_database()
+        self.queries = QueryDispatcher(self.root)  # Shared worker pool for view queries
+        self.app_monitor = AppMonitor(self.db_path, afk_threshold=self.settings.get("afk_threshold"), autosave=self.settings.get("autosave"))
         self.focus_mode = FocusMode(self.root)
         self.stop_distract = self.stop_distract = StopDistract(self.root, self.settings.get("reminder"), self.app_monitor)
-        self.dashboard = ProductivityDashboard(self.root, self.app_monitor, self.rename_app, self.db_path, stop_distract=self.stop_distract)
+        self.dashboard = ProductivityDashboard(self.root, self.app_monitor, self.rename_app, self.db_path, stop_distract=self.stop_distract, queries=self.queries)
         self.dashboard.settings = self.settings  # Pass settings to the dashboard
-        self.calendar_view = CalendarView(self.root, self.show_dashboard)
+        self.calendar_view = CalendarView(self.root, self.show_dashboard, self.db_path, queries=self.queries)
+        # Technique runs share the monitor's scheduler thread, which owns StopDistract's state
+        self.dynamic_schedule = DynamicSchedule(scheduler=self.app_monitor.scheduler, db_path=self.db_path, confirm_transitions=True)
+        self.dynamic_schedule.subscribe(self.stop_distract.on_schedule_event)
+        self.dynamic_schedule.subscribe(self.on_schedule_event)
+        self.dashboard.dynamic_schedule = self.dynamic_schedule  # Compiles techniques into schedules
 
         # Start monitoring
         self.app_monitor.start_monitoring()
         if self.settings.get("afk_detection"):
             self.app_monitor.start_afk_detection()
         # self.app_monitor.start_minimize()
-        self._setup_database()
 
         # Bind the close event to save focus times if autosave is enabled
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
@@ -139,10 +151,33 @@ class SmartClockApp:
         dynamic_schedule_var = ctk.StringVar(value="pomodoro")  # Default technique
         ctk.CTkOptionMenu(
             self.root,
-            values=["pomodoro", "eat the frog", "custom"],
+            values=self.dynamic_schedule.technique_names(),
             variable=dynamic_schedule_var
         ).pack(pady=5)
 
+        technique_frame = ctk.CTkFrame(self.root)
+        technique_frame.pack(pady=5)
+        ctk.CTkButton(
+            technique_frame,
+            text="Start Technique",
+            command=lambda: self.start_technique(dynamic_schedule_var.get())
+        ).pack(side=ctk.LEFT, padx=5)
+        ctk.CTkButton(
+            technique_frame,
+            text="Stop Technique",
+            command=self.stop_techniques
+        ).pack(side=ctk.LEFT, padx=5)
+        ctk.CTkButton(
+            technique_frame,
+            text="Finish Block",
+            command=lambda: self.control_techniques("finish")
+        ).pack(side=ctk.LEFT, padx=5)
+        ctk.CTkButton(
+            technique_frame,
+            text="Skip Block",
+            command=lambda: self.control_techniques("skip")
+        ).pack(side=ctk.LEFT, padx=5)
+
         # Save and exit buttons
         button_frame = ctk.CTkFrame(self.root)
         button_frame.pack(pady=10)
@@ -176,16 +211,8 @@ class SmartClockApp:
 
         ctk.CTkLabel(popup, text="Classify Applications", font=("Arial", 16)).pack(pady=10)
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT app_name FROM usage_data GROUP BY app_name")
-        usage_apps = cursor.fetchall()
-        cursor.execute("SELECT app_name, category FROM classify_app")
-        classified_apps = dict(cursor.fetchall())
-        cursor.execute("SELECT original_name, custom_name FROM app_names")
-        app_nicknames = dict(cursor.fetchall())
-        conn.close()
-
+        classified_apps = {}
+        app_nicknames = {}
         app_vars = {}
         tree_frame = ctk.CTkFrame(popup)
         tree_frame.pack(fill="both", expand=True, padx=10, pady=10)
@@ -210,14 +237,30 @@ class SmartClockApp:
         tree.heading('Category', text='Category')
         tree.pack(fill="both", expand=True)
 
-        for (app_name,) in usage_apps:
-            display_name = app_nicknames.get(app_name, app_name)
-            category = classified_apps.get(app_name, "NONE")
-            app_vars[app_name] = ctk.StringVar(value=category)
-            tree.insert('', 'end', values=(display_name, category))
+        loading_row = tree.insert('', 'end', values=("Loading...", ""))
+
+        def load():
+            return self.storage.usage_app_names(), dict(self.storage.classifications()), self.storage.custom_names()
+
+        def loaded(result):
+            if not tree.winfo_exists():
+                return
+            usage_apps, classifications, nicknames = result
+            classified_apps.update(classifications)
+            app_nicknames.update(nicknames)
+            tree.delete(loading_row)
+            for app_name in usage_apps:
+                display_name = app_nicknames.get(app_name, app_name)
+                category = classified_apps.get(app_name, "NONE")
+                app_vars[app_name] = ctk.StringVar(value=category)
+                tree.insert('', 'end', values=(display_name, category))
+
+        self.queries.submit(load, on_result=loaded, owner=popup)
 
         def on_tree_select(event):
             selected_item = tree.selection()[0]
+            if selected_item == loading_row:
+                return
             display_name, current_category = tree.item(selected_item, 'values')
             app_name = next(key for key, value in app_nicknames.items() if value == display_name) if display_name in app_nicknames.values() else display_name
 
@@ -230,7 +273,7 @@ class SmartClockApp:
             ctk.CTkLabel(category_popup, text="Select Category:").pack(pady=5)
             category_dropdown = ctk.CTkOptionMenu(
                 category_popup,
-                values=["Productive", "Unproductive"],
+                values=["PRODUCTIVE", "NONPRODUCTIVE"],
                 variable=category_var
             )
             category_dropdown.pack(pady=5)
@@ -248,28 +291,28 @@ class SmartClockApp:
         tree.bind("<Double-1>", on_tree_select)
 
         def save_classifications():
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            rows = []
             for item in tree.get_children():
+                if item == loading_row:
+                    continue
                 display_name, category = tree.item(item, 'values')
                 app_name = next(key for key, value in app_nicknames.items() if value == display_name) if display_name in app_nicknames.values() else display_name
-                cursor.execute(
-                    "INSERT OR REPLACE INTO classify_app (app_name, category) VALUES (?, ?)",
-                    (app_name, category)
-                )
-            conn.commit()
-            conn.close()
+                rows.append((app_name, category))
+                self.app_monitor.classifier.set(app_name, category)
+            self.storage.set_classifications(rows)
             popup.destroy()
 
         ctk.CTkButton(popup, text="Save", command=save_classifications).pack(pady=10)
         popup.focus_force()
         popup.transient(self.root)
         self.root.wait_window(popup)
+        self.queries.cancel(popup)
 
 
     def save_settings_with_theme_and_schedule(self, autosave_var, theme_var, mode_var, afk_detection_var, reminder_var, dynamic_schedule_var, afk_threshold_var, update_ui=False, reopen_settings=False):
         """Save settings, theme, and mode, and apply changes with a restart prompt."""
         self.settings.update("autosave", autosave_var.get())
+        self.app_monitor.writer.periodic = autosave_var.get()  # Periodic flushes follow the autosave setting
         self.settings.update("afk_detection", afk_detection_var.get())
         self.settings.update("reminder", reminder_var.get())
         self.settings.update("dynamic_schedule", dynamic_schedule_var.get())
@@ -332,89 +375,51 @@ class SmartClockApp:
             self.open_settings()
 
 
+    def start_technique(self, technique_name):
+        """Start a dynamic scheduling technique, stopping any that is already running."""
+        self.stop_techniques()
+        if self.dynamic_schedule.start_technique(technique_name) is None:
+            show_ok_popup(self.root, f"No blocks are set up for the {technique_name} technique.", title="Dynamic Scheduling")
+
+    def stop_techniques(self):
+        self.control_techniques("cancel")
+
+    def control_techniques(self, action):
+        """Apply "finish" (done early, logged), "skip" (not logged) or "cancel" to the running techniques."""
+        for run in self.dynamic_schedule.active_runs():
+            getattr(run, action)()
+
+    def on_schedule_event(self, event, run):
+        """Runs on the scheduler thread; announces technique transitions on the Tk thread."""
+        if event == "block_due":
+            # The block was logged at its deadline; the next one waits until the user is back
+            self.root.after(0, self.confirm_block_end, run)
+        elif event == "reminder":
+            message = f"{run.block.name} ends in {round(run.remaining() / 60)} minutes."
+            self.root.after(0, lambda: show_ok_popup(self.root, message, title="Reminder"))
+
+    def confirm_block_end(self, run):
+        """Announce the next block of a technique run and start it once the user clicks through."""
+        if run.index + 1 < len(run.blocks):
+            next_block = run.blocks[run.index + 1]
+            message = "Time to get to work!" if next_block.type == "PRODUCTIVE" else "Time to get some rest!"
+            show_ok_popup(self.root, message, title=f"{run.block.name} Complete", ok_text="Next Task")
+        else:
+            show_ok_popup(self.root, "You have gone through all scheduled times.", title="Schedule Complete")
+        run.advance()
+
     def rename_app(self, old_name, new_name):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        try:
-            cursor.execute("UPDATE usage_data SET app_name = ? WHERE app_name = ?", (new_name, old_name))
-        except sqlite3.IntegrityError:
-            cursor.execute(
-                """
-                UPDATE usage_data
-                SET focus_time = focus_time + (SELECT focus_time FROM usage_data WHERE app_name = ?)
-                WHERE app_name = ? AND date IN (SELECT date FROM usage_data WHERE app_name = ?)
-                """,
-                (old_name, new_name, old_name)
-            )
-            cursor.execute("DELETE FROM usage_data WHERE app_name = ?", (old_name,))
-        cursor.execute("INSERT OR REPLACE INTO app_names (original_name, custom_name) VALUES (?, ?)", (old_name, new_name))
-        conn.commit()
-        conn.close()
+        self.storage.rename_app(old_name, new_name)
         self.dashboard.display_times()
 
     def _setup_database(self):
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS usage_data (
-                id INTEGER PRIMARY KEY,
-                date TEXT NOT NULL,
-                app_name TEXT NOT NULL,
-                focus_time REAL NOT NULL,
-                UNIQUE(date, app_name)
-            )
-            """
-        )
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS app_names (
-                original_name TEXT PRIMARY KEY,
-                custom_name TEXT
-            )
-            """
-        )
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS classify_app (
-                app_name TEXT PRIMARY KEY,
-                category TEXT
-            )
-            """
-        )
-        # cursor.execute(
-        #     """DROP TABLE IF EXISTS schedule_times;"""
-        # )
-        # cursor.execute(
-        #     """DROP TABLE IF EXISTS schedule;"""
-        # )
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS schedule_times (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                next_id INTEGER,
-                type TEXT NOT NULL,
-                duration INTEGER NOT NULL,
-                FOREIGN KEY(next_id) REFERENCES schedule(id)
-          )
-            """
-        )
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS schedule (
-                name TEXT PRIMARY KEY,
-                id INTEGER,
-                FOREIGN KEY(id) REFERENCES schedule_times(schedule_id)
-            )
-            """
-        )
-        conn.commit()
-        conn.close()
+        self.storage.setup()
 
     def on_close(self):
-        if self.settings.get("autosave"):
-            self.app_monitor.save_focus_times(self.db_path)
+        self.dynamic_schedule.close()
+        self.app_monitor.stop_monitoring(save=self.settings.get("autosave"))
+        self.queries.shutdown()
+        self.storage.close_all()
         self.root.destroy()
 
     def on_minimize(self):
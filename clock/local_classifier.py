@@ -0,0 +1,117 @@
+# clock/local_classifier.py
+import math
+import re
+from threading import Lock
+
+CATEGORIES = ("PRODUCTIVE", "NONPRODUCTIVE")
+
+# Labels written by older versions of the classify popup
+LABEL_ALIASES = {"PRODUCTIVE": "PRODUCTIVE", "NONPRODUCTIVE": "NONPRODUCTIVE", "UNPRODUCTIVE": "NONPRODUCTIVE"}
+
+KEYWORD_RULES = {
+    "PRODUCTIVE": ["code", "studio", "terminal", "iterm", "iterm2", "pycharm", "intellij", "xcode", "vim", "emacs", "github",
+                   "gitlab", "stackoverflow", "docs", "notion", "excel", "word", "powerpoint", "outlook", "slack",
+                   "jira", "confluence", "figma", "overleaf"],
+    "NONPRODUCTIVE": ["youtube", "netflix", "reddit", "twitch", "steam", "facebook", "instagram", "tiktok", "twitter",
+                      "discord", "spotify", "hulu", "primevideo", "9gag", "epicgames", "roblox"],
+}
+
+# {keyword: category}, for looking up the rule of each token
+KEYWORD_INDEX = {keyword: category for category, keywords in KEYWORD_RULES.items() for keyword in keywords}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+IGNORED_TOKENS = {"www", "com", "org", "net", "io", "co", "app", "exe", "http", "https"}
+
+def normalize_category(category):
+    """Map a stored label to PRODUCTIVE/NONPRODUCTIVE, or None if it is not a usable label."""
+    if not category:
+        return None
+    return LABEL_ALIASES.get(str(category).strip().upper())
+
+def tokenize(name):
+    """Split an app name or domain into lowercase tokens."""
+    return [token for token in TOKEN_PATTERN.findall(name.lower()) if len(token) > 1 and token not in IGNORED_TOKENS]
+
+class LocalClassifier:
+    """Multinomial naive Bayes over app name and domain tokens, backed by keyword rules.
+
+    The rules decide on their own only when none of the name's tokens were seen in the
+    user's labels; otherwise each keyword counts as `rule_weight` extra labelled occurrence,
+    so a few labels of the user's own outweigh it.
+    """
+
+    def __init__(self, rule_confidence=0.95, rule_weight=1):
+        self.rule_confidence = rule_confidence
+        self.rule_weight = rule_weight
+        self.labels = {}  # {app_name: category} the model was trained on
+        self.class_counts = {category: 0 for category in CATEGORIES}
+        self.token_counts = {category: {} for category in CATEGORIES}
+        self.token_totals = {category: 0 for category in CATEGORIES}
+        self.vocabulary = {}  # {token: occurrences across all trained names}
+        self.lock = Lock()
+
+    def train(self, rows):
+        """Train from (app_name, category) rows such as the classify_app table."""
+        for app_name, category in rows:
+            self.learn(app_name, category)
+
+    def learn(self, app_name, category):
+        """Add or relabel one example in O(tokens)."""
+        category = normalize_category(category)
+        with self.lock:
+            previous = self.labels.get(app_name)
+            if previous == category:
+                return
+            if previous:
+                self._count(app_name, previous, -1)
+                del self.labels[app_name]
+            if category:
+                self._count(app_name, category, 1)
+                self.labels[app_name] = category
+
+    def _count(self, app_name, category, step):
+        self.class_counts[category] += step
+        counts = self.token_counts[category]
+        for token in tokenize(app_name):
+            counts[token] = counts.get(token, 0) + step
+            self.token_totals[category] += step
+            self.vocabulary[token] = self.vocabulary.get(token, 0) + step
+            if not counts[token]:
+                del counts[token]
+            if not self.vocabulary[token]:
+                del self.vocabulary[token]
+
+    def predict(self, app_name):
+        """Return (category, confidence) for `app_name`; category is None when nothing is known."""
+        with self.lock:
+            label = self.labels.get(app_name)
+            if label:
+                return label, 1.0
+            tokens = tokenize(app_name)
+            known = [token for token in tokens if token in self.vocabulary]
+            total = sum(self.class_counts.values())
+            if not known or not total:
+                # Nothing the user labelled bears on this name, so the keyword rules decide
+                rule = self._match_rule(tokens)
+                return (rule, self.rule_confidence) if rule else (None, 0.0)
+            scored = known + [token for token in tokens if token in KEYWORD_INDEX and token not in self.vocabulary]
+            vocabulary_size = len(self.vocabulary)
+            scores = {}
+            for category in CATEGORIES:
+                score = math.log((self.class_counts[category] + 1) / (total + len(CATEGORIES)))
+                denominator = self.token_totals[category] + vocabulary_size + self.rule_weight
+                counts = self.token_counts[category]
+                for token in scored:
+                    prior = self.rule_weight if KEYWORD_INDEX.get(token) == category else 0
+                    score += math.log((counts.get(token, 0) + prior + 1) / denominator)
+                scores[category] = score
+        best = max(scores, key=scores.get)
+        peak = scores[best]
+        confidence = 1 / sum(math.exp(score - peak) for score in scores.values())
+        return best, confidence
+
+    def _match_rule(self, tokens):
+        for token in tokens:
+            if token in KEYWORD_INDEX:
+                return KEYWORD_INDEX[token]
+        return None
@@ -0,0 +1,321 @@
+# clock/migrations.py
+# Schema migrations for usage_data.db, applied in order and tracked with PRAGMA user_version.
+# Append new steps to MIGRATIONS; never edit or reorder a step that has shipped.
+
+def _baseline(conn):
+    """Tables created by versions that predate migrations."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_data (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            app_name TEXT NOT NULL,
+            focus_time REAL NOT NULL,
+            UNIQUE(date, app_name)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS apps (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app_names (
+            original_name TEXT PRIMARY KEY,
+            custom_name TEXT
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS classify_app (
+            app_name TEXT PRIMARY KEY,
+            category TEXT
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schedule_times (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            next_id INTEGER,
+            type TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            FOREIGN KEY(next_id) REFERENCES schedule(id)
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schedule (
+            name TEXT PRIMARY KEY,
+            id INTEGER,
+            FOREIGN KEY(id) REFERENCES schedule_times(schedule_id)
+        )
+        """
+    )
+
+def _usage_and_schedule_indexes(conn):
+    """Covering indexes for date-range and per-app queries, and the schedule list links."""
+    # Day and date-range views (calendar, statistics) scan this index without touching the table
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_date ON usage_data(date, app_name, focus_time)")
+    # Per-app totals and history read the rows of one app in date order
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_app_date ON usage_data(app_name, date, focus_time)")
+    # remove_task looks up the predecessor of a task
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_schedule_times_next ON schedule_times(next_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_schedule_head ON schedule(id)")
+
+def _rollups(conn):
+    """Per-app and per-category totals by week, month, year and all time."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_rollup (
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            app_name TEXT NOT NULL,
+            focus_time REAL NOT NULL,
+            PRIMARY KEY(period, bucket, app_name)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS category_rollup (
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            category TEXT NOT NULL,
+            focus_time REAL NOT NULL,
+            PRIMARY KEY(period, bucket, category)
+        ) WITHOUT ROWID
+        """
+    )
+    # Largest-first listings of one bucket, e.g. the all-time totals view
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_usage_rollup_time ON usage_rollup(period, bucket, focus_time)")
+    rebuild_rollups(conn)
+
+def _ordered_schedules(conn):
+    """Replace the schedule/schedule_times.next_id linked lists with schedules and positioned tasks."""
+    conn.execute("CREATE TABLE schedules (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.execute("INSERT INTO schedules (name) SELECT name FROM schedule WHERE id IS NOT NULL ORDER BY rowid")
+    # Walk every list once; the visited path stops at a cycle instead of looping forever
+    conn.execute(
+        """
+        CREATE TEMP TABLE schedule_walk AS
+        WITH RECURSIVE walk(schedule_id, task_id, position, path) AS (
+            SELECT s.id, old.id, 0, ',' || old.id || ','
+            FROM schedule old JOIN schedules s ON s.name = old.name
+            WHERE old.id IS NOT NULL
+            UNION ALL
+            SELECT w.schedule_id, t.next_id, w.position + 1, w.path || t.next_id || ','
+            FROM walk w JOIN schedule_times t ON t.id = w.task_id
+            WHERE t.next_id IS NOT NULL AND instr(w.path, ',' || t.next_id || ',') = 0
+        )
+        SELECT schedule_id, task_id, MIN(position) AS position FROM walk GROUP BY task_id
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE schedule_times_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            schedule_id INTEGER NOT NULL REFERENCES schedules(id),
+            position INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            UNIQUE(schedule_id, position)
+        )
+        """
+    )
+    # Rows no list reaches (left behind by the old remove_task) are dropped here
+    conn.execute(
+        """
+        INSERT INTO schedule_times_new (id, schedule_id, position, type, duration)
+        SELECT t.id, w.schedule_id, w.position, t.type, t.duration
+        FROM schedule_walk w JOIN schedule_times t ON t.id = w.task_id
+        WHERE 1
+        ON CONFLICT(schedule_id, position) DO NOTHING
+        """
+    )
+    conn.execute("DROP TABLE schedule_walk")
+    conn.execute("DROP TABLE schedule_times")
+    conn.execute("DROP TABLE schedule")
+    conn.execute("ALTER TABLE schedule_times_new RENAME TO schedule_times")
+    conn.execute("DELETE FROM schedules WHERE id NOT IN (SELECT schedule_id FROM schedule_times)")
+
+def _app_identities(conn):
+    """Resolve app names through aliases at query time instead of rewriting usage_data on rename."""
+    conn.execute("CREATE TABLE app_identities (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.execute(
+        """
+        CREATE TABLE app_aliases (
+            app_name TEXT PRIMARY KEY,
+            identity_id INTEGER NOT NULL REFERENCES app_identities(id)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute("CREATE INDEX idx_app_aliases_identity ON app_aliases(identity_id)")
+    conn.execute("INSERT INTO app_identities (name) SELECT DISTINCT custom_name FROM app_names WHERE custom_name IS NOT NULL")
+    conn.execute(
+        """
+        INSERT INTO app_aliases (app_name, identity_id)
+        SELECT n.original_name, i.id FROM app_names n JOIN app_identities i ON i.name = n.custom_name
+        """
+    )
+    # Old renames moved history to the new name itself; alias it so it follows later renames
+    conn.execute("INSERT OR IGNORE INTO app_aliases (app_name, identity_id) SELECT name, id FROM app_identities")
+    conn.execute("DROP TABLE app_names")
+    conn.execute(
+        """
+        CREATE VIEW app_names (original_name, custom_name) AS
+        SELECT a.app_name, i.name FROM app_aliases a JOIN app_identities i ON i.id = a.identity_id
+        """
+    )
+    for view, table in (("resolved_usage", "usage_data"), ("resolved_rollup", "usage_rollup")):
+        conn.execute(
+            f"""
+            CREATE VIEW {view} AS
+            SELECT t.*, COALESCE(n.custom_name, t.app_name) AS display_name
+            FROM {table} t LEFT JOIN app_names n ON n.original_name = t.app_name
+            """
+        )
+
+def _app_totals(conn):
+    """All-time totals by display name, ordered by an index for paging through every app."""
+    conn.execute(
+        """
+        CREATE TABLE app_totals (
+            name TEXT PRIMARY KEY,
+            focus_time REAL NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute("CREATE INDEX idx_app_totals_time ON app_totals(focus_time, name)")
+    rebuild_app_totals(conn)
+
+def _task_runs(conn):
+    """History of dynamic schedule blocks and the running per-task duration estimates learned from it."""
+    conn.execute(
+        """
+        CREATE TABLE task_runs (
+            id INTEGER PRIMARY KEY,
+            task_name TEXT NOT NULL,
+            planned REAL NOT NULL,
+            actual REAL NOT NULL,
+            ended_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX idx_task_runs_name ON task_runs(task_name, id)")
+    conn.execute(
+        """
+        CREATE TABLE task_estimates (
+            task_name TEXT PRIMARY KEY,
+            runs INTEGER NOT NULL,
+            ewma REAL NOT NULL,
+            p50 REAL NOT NULL,
+            p90 REAL NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+
+def _classification_labels(conn):
+    """Tell the categories the user picked from ones a remote classifier guessed."""
+    # The origin of existing rows is unknown, so they stay labels
+    conn.execute("ALTER TABLE classify_app ADD COLUMN labelled INTEGER NOT NULL DEFAULT 1")
+
+MIGRATIONS = [
+    _baseline,
+    _usage_and_schedule_indexes,
+    _rollups,
+    _ordered_schedules,
+    _app_identities,
+    _app_totals,
+    _task_runs,
+    _classification_labels,
+]
+
+# Bucket key of each rollup period for an ISO date column; weeks start on Monday
+ROLLUP_BUCKETS = (
+    ("week", "date({0}, 'weekday 0', '-6 days')"),
+    ("month", "substr({0}, 1, 7)"),
+    ("year", "substr({0}, 1, 4)"),
+    ("all", "''"),
+)
+UNCLASSIFIED = "UNCLASSIFIED"  # Category rollup key for apps without a category
+
+def rebuild_rollups(conn):
+    """Regenerate the rollup tables from usage_data."""
+    conn.execute("DELETE FROM usage_rollup")
+    conn.execute("DELETE FROM category_rollup")
+    for period, bucket in ROLLUP_BUCKETS:
+        conn.execute(
+            f"""
+            INSERT INTO usage_rollup (period, bucket, app_name, focus_time)
+            SELECT ?, {bucket.format('date')}, app_name, SUM(focus_time)
+            FROM usage_data
+            GROUP BY 2, app_name
+            """, (period,)
+        )
+    add_category_rollups(conn)
+
+def rebuild_app_totals(conn):
+    """Regenerate app_totals from the all-time rollup, merging apps shown under the same name."""
+    conn.execute("DELETE FROM app_totals")
+    conn.execute(
+        """
+        INSERT INTO app_totals (name, focus_time)
+        SELECT display_name, SUM(focus_time) FROM resolved_rollup
+        WHERE period = 'all' AND bucket = ''
+        GROUP BY display_name
+        """
+    )
+
+def add_category_rollups(conn, app_names=None, sign=1):
+    """Add the usage_rollup rows of `app_names` (default all) to category_rollup under their
+    current category; sign=-1 removes them, e.g. before a category changes."""
+    where, params = _app_filter("r.app_name", app_names)
+    conn.execute(
+        f"""
+        INSERT INTO category_rollup (period, bucket, category, focus_time)
+        SELECT r.period, r.bucket, COALESCE(c.category, ?) AS key, ? * SUM(r.focus_time)
+        FROM usage_rollup r LEFT JOIN classify_app c ON c.app_name = r.app_name
+        {where or "WHERE 1"}
+        GROUP BY r.period, r.bucket, key
+        ON CONFLICT(period, bucket, category) DO UPDATE SET focus_time = focus_time + excluded.focus_time
+        """, (UNCLASSIFIED, sign) + params
+    )
+
+def _app_filter(column, app_names):
+    if app_names is None:
+        return "", ()
+    app_names = tuple(app_names)
+    return f"WHERE {column} IN ({', '.join('?' * len(app_names))})", app_names
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """Apply every pending migration, each in its own transaction. Returns the new version."""
+    version = schema_version(conn)
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # Manage transactions explicitly so DDL is covered too
+    try:
+        for target, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if schema_version(conn) >= target:
+                    conn.execute("ROLLBACK")  # Another process applied it first
+                    continue
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    finally:
+        conn.isolation_level = isolation_level
+    return schema_version(conn)
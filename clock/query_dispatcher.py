@@ -0,0 +1,87 @@
+# clock/query_dispatcher.py
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty
+
+class QueryTicket:
+    """Handle for a query submitted to QueryDispatcher."""
+
+    def __init__(self, owner, on_result, on_error):
+        self.owner = owner
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self):
+        """Drop the result; the query itself still runs to completion on its worker."""
+        self.cancelled = True
+
+class QueryDispatcher:
+    """Runs view queries on a small worker pool and delivers the results on the Tk thread.
+
+    Workers only put results on a queue; the Tk thread drains it with root.after while
+    queries are outstanding, so callbacks may touch widgets. submit and cancel must be
+    called from the Tk thread.
+    """
+
+    def __init__(self, root, workers=2, poll_interval=30):
+        self.root = root
+        self.poll_interval = poll_interval  # Milliseconds between queue checks
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="view-query")
+        self.results = Queue()
+        self.tickets = set()  # Submitted and not yet delivered
+        self.poll_job = None
+
+    def submit(self, fn, *args, on_result=None, on_error=None, owner=None):
+        """Run fn(*args) on a worker and pass its result to on_result (or the exception to on_error) on the Tk thread."""
+        ticket = QueryTicket(owner, on_result, on_error)
+        self.tickets.add(ticket)
+        self.executor.submit(self._run, ticket, fn, args)
+        if self.poll_job is None:
+            self.poll_job = self.root.after(self.poll_interval, self._poll)
+        return ticket
+
+    def cancel(self, owner):
+        """Cancel every outstanding query submitted for `owner`, e.g. a view the user left."""
+        for ticket in self.tickets:
+            if ticket.owner is owner:
+                ticket.cancel()
+
+    def shutdown(self):
+        for ticket in self.tickets:
+            ticket.cancel()
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+            self.poll_job = None
+        self.executor.shutdown(wait=False)
+
+    def _run(self, ticket, fn, args):
+        if ticket.cancelled:
+            self.results.put((ticket, None, None))
+            return
+        try:
+            self.results.put((ticket, fn(*args), None))
+        except Exception as e:
+            self.results.put((ticket, None, e))
+
+    def _poll(self):
+        self.poll_job = None
+        while True:
+            try:
+                ticket, result, error = self.results.get_nowait()
+            except Empty:
+                break
+            self.tickets.discard(ticket)
+            if ticket.cancelled:
+                continue
+            try:
+                if error is not None:
+                    if ticket.on_error:
+                        ticket.on_error(error)
+                    else:
+                        print(f"Error in view query: {error}")
+                elif ticket.on_result:
+                    ticket.on_result(result)
+            except Exception as e:
+                print(f"Error delivering view query result: {e}")
+        if self.tickets:
+            self.poll_job = self.root.after(self.poll_interval, self._poll)
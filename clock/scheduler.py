@@ -0,0 +1,121 @@
+# clock/scheduler.py
+import heapq
+import itertools
+import time
+from threading import Thread, Condition, Event, get_ident
+
+class Job:
+    """Handle for a callback registered with TickScheduler."""
+
+    def __init__(self, fn, args, interval=None):
+        self.fn = fn
+        self.args = args
+        self.interval = interval  # Seconds between runs, None for one-shot jobs
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class TickScheduler:
+    """Single thread that runs periodic and one-shot jobs in due order.
+
+    Jobs share the scheduler thread, so state they own needs no locking
+    between them; other threads hand work over with call_soon or call_and_wait.
+    """
+
+    def __init__(self, name="tick-scheduler"):
+        self.name = name
+        self.queue = []  # Heap of (due, sequence, job)
+        self.sequence = itertools.count()
+        self.condition = Condition()
+        self.running = False
+        self.thread = None
+        self.thread_id = None
+
+    def start(self):
+        """Start the scheduler thread."""
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread; queued jobs are kept for a later start."""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread and not self.in_scheduler_thread():
+            self.thread.join()
+        self.thread = None
+
+    def in_scheduler_thread(self):
+        return get_ident() == self.thread_id
+
+    def call_later(self, delay, fn, *args):
+        """Run fn(*args) once after `delay` seconds."""
+        return self._push(time.monotonic() + delay, Job(fn, args))
+
+    def call_soon(self, fn, *args):
+        """Run fn(*args) on the scheduler thread as soon as possible."""
+        return self.call_later(0, fn, *args)
+
+    def every(self, interval, fn, *args, delay=None):
+        """Run fn(*args) every `interval` seconds, first after `delay` (default `interval`)."""
+        job = Job(fn, args, interval)
+        return self._push(time.monotonic() + (interval if delay is None else delay), job)
+
+    def call_and_wait(self, fn, *args, timeout=5):
+        """Run fn(*args) on the scheduler thread and return its result.
+
+        Runs inline when called from the scheduler thread or while it is stopped.
+        """
+        if self.in_scheduler_thread() or not self.running:
+            return fn(*args)
+        done = Event()
+        result = {}
+
+        def run():
+            try:
+                result["value"] = fn(*args)
+            finally:
+                done.set()
+
+        self.call_soon(run)
+        done.wait(timeout)
+        return result.get("value")
+
+    def _push(self, due, job):
+        with self.condition:
+            heapq.heappush(self.queue, (due, next(self.sequence), job))
+            self.condition.notify()
+        return job
+
+    def _run(self):
+        self.thread_id = get_ident()
+        while True:
+            with self.condition:
+                while self.running:
+                    if self.queue and self.queue[0][2].cancelled:
+                        heapq.heappop(self.queue)
+                        continue
+                    timeout = self.queue[0][0] - time.monotonic() if self.queue else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self.condition.wait(timeout)
+                if not self.running:
+                    self.thread_id = None
+                    return
+                due, _, job = heapq.heappop(self.queue)
+            try:
+                job.fn(*job.args)
+            except Exception as e:
+                print(f"Error in scheduled job {getattr(job.fn, '__name__', job.fn)}: {e}")
+            if job.interval is not None and not job.cancelled:
+                # Skip missed runs instead of running them back to back
+                next_due = due + job.interval
+                now = time.monotonic()
+                if next_due <= now:
+                    next_due = now + job.interval
+                self._push(next_due, job)
@@ -1,12 +1,15 @@
 import customtkinter as ctk
-import sqlite3
 from datetime import timedelta, date
 from utils import format_time
+from storage import Storage
+from query_dispatcher import QueryDispatcher
 
 class Statistics:
-    def __init__(self, root):
+    def __init__(self, root, db_path='db/usage_data.db', queries=None):
         self.root = root
-        self.db_path = 'db/usage_data.db'
+        self.db_path = db_path
+        self.storage = Storage.open(db_path)
+        self.queries = queries or QueryDispatcher(root)  # Runs the aggregations off the Tk thread
 
     def show_statistics(self):
         stats_window = ctk.CTkToplevel(self.root)
@@ -20,15 +23,15 @@ class Statistics:
         label = ctk.CTkLabel(stats_window)
         label.pack()
 
-        self.period = ctk.CTkComboBox(frame, values=["last day", "week", "month", "year", "custom"])
+        self.period = ctk.CTkComboBox(frame, values=["last day", "week", "month", "year", "all time", "custom"])
         self.period.pack(side=ctk.LEFT)
         button = ctk.CTkButton(frame, text="Load Stats")
         button.pack(side=ctk.LEFT)
 
         button.configure(command=lambda: self.show(label))
+        stats_window.bind("<Destroy>", lambda event: self.queries.cancel(self) if event.widget is stats_window else None)
 
     def show(self, label):
-        conn = sqlite3.connect(self.db_path)
         period = self.period.get()
         today = date.today()
         if period == "last day":
@@ -39,19 +42,26 @@ class Statistics:
             start_date = today - timedelta(days=30)
         elif period == "year":
             start_date = today - timedelta(days=365)
+        elif period == "all time":
+            start_date = None
         else:
             start_date = today - timedelta(days=7)  # Default to last week
 
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT app_name, SUM(focus_time) 
-            FROM usage_data 
-            WHERE date >= ? 
-            GROUP BY app_name
-        """, (start_date.isoformat(),))
-        data = cursor.fetchall()
-        conn.close()
-
-        stats_text = "\n".join([f"{app}: {format_time(time)}" for app, time in data])
+        self.queries.cancel(self)  # Only the latest request is shown
+        label.configure(text="Loading...")
+        self.queries.submit(self.load, start_date, today, on_result=lambda result: self.display(label, *result), owner=self)
+
+    def load(self, start_date, today):
+        """Return (category totals, app totals) for the period (runs on a query worker)."""
+        if start_date is None:
+            return self.storage.category_totals(), self.storage.usage_totals()
+        start, end = start_date.isoformat(), today.isoformat()
+        return self.storage.category_between(start, end), self.storage.usage_between(start, end)
+
+    def display(self, label, categories, data):
+        if not label.winfo_exists():
+            return
+        stats_text = "\n".join([f"{category}: {format_time(time)}" for category, time in categories])
+        stats_text += "\n\n" + "\n".join([f"{app}: {format_time(time)}" for app, time in data])
         label.configure(text=stats_text)
 
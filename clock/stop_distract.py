@@ -1,6 +1,4 @@
 import customtkinter as ctk
-import time
-from threading import Thread
 from utils import show_ok_popup, show_ok_popup_with_cancel
 
 class StopDistract:
@@ -12,22 +10,42 @@ class StopDistract:
         self.check = False
         self.status = None
         self.changed = False
+        self.minimize_job = None
+        self.app_monitor.subscribe(self.on_focus_change)
         
     def start(self):
         self.check = True
-        Thread(target=self.check_response).start()
         
     def stop(self):
         self.status = None
         self.check = False
-        
-    def check_response(self):
-        while self.check:
-            if self.status == "PRODUCTIVE":
-                if self.app_monitor.category == "NONPRODUCTIVE" and self.changed:
-                    self.changed = False
-                    self.trigger_response()
-            time.sleep(1)
+        if self.minimize_job:
+            self.minimize_job.cancel()
+            self.minimize_job = None
+
+    def set_status(self, status):
+        """Set the type of the running task and re-arm the response for it."""
+        self.status = status
+        self.changed = True
+        snapshot = self.app_monitor.snapshot()
+        self.app_monitor.scheduler.call_soon(self.on_focus_change, snapshot["current_app"], snapshot["category"])
+
+    def on_schedule_event(self, event, run):
+        """Follow a DynamicSchedule run: guard its productive blocks and stop when it ends."""
+        if event == "block_started":
+            self.start()
+            self.set_status(run.block.type)
+        elif event in ("paused", "cancelled", "finished"):
+            self.stop()
+        elif event == "resumed":
+            self.start()
+            self.set_status(run.block.type)
+
+    def on_focus_change(self, app_name, category):
+        """Runs on the monitor scheduler thread whenever focus or category changes."""
+        if self.check and self.status == "PRODUCTIVE" and category == "NONPRODUCTIVE" and self.changed:
+            self.changed = False
+            self.root.after(0, self.trigger_response)  # Popups must be created on the Tk thread
         
     def trigger_response(self):
         if self.response_type == "low":
@@ -50,21 +68,9 @@ class StopDistract:
         cancel = False
         show_ok_popup_with_cancel(self.root, message=message, on_cancel=on_cancel)
 
-        def countdown():
-            nonlocal cancel
-            for _ in range(5, 0, -1):
-                time.sleep(1)
-            if not cancel:
-                self.app_monitor.start_minimize()
-
-        Thread(target=countdown).start()
+        if not cancel:
+            self.minimize_job = self.app_monitor.scheduler.call_later(5, self.app_monitor.start_minimize)
 
     def show_popup_no_cancel(self, message):
         show_ok_popup(self.root, message=message)
-
-        def countdown():
-            for i in range(5, 0, -1):
-                time.sleep(1)
-            self.app_monitor.start_minimize()
-
-        Thread(target=countdown).start()
+        self.minimize_job = self.app_monitor.scheduler.call_later(5, self.app_monitor.start_minimize)
@@ -0,0 +1,557 @@
+# clock/storage.py
+import argparse
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, timedelta
+from threading import Lock, local
+import migrations
+from migrations import UNCLASSIFIED
+
+def rollup_buckets(day):
+    """Return [(period, bucket)] that the ISO date `day` counts towards, as in migrations.ROLLUP_BUCKETS."""
+    d = date.fromisoformat(day)
+    return [
+        ("week", (d - timedelta(days=d.weekday())).isoformat()),
+        ("month", day[:7]),
+        ("year", day[:4]),
+        ("all", ""),
+    ]
+
+def _next_month(d):
+    """First day of the month after `d`."""
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+EWMA_ALPHA = 0.3  # Weight of the newest run in a task's moving average
+QUANTILE_STEP = 0.05  # Quantile estimates move by this fraction of the moving average per run
+
+def update_estimate(estimate, actual):
+    """Return (runs, ewma, p50, p90) after a run of `actual` seconds, given the previous tuple or None.
+
+    Quantiles use a streaming estimator: each run nudges them up by tau * step when it is
+    longer and down by (1 - tau) * step otherwise, so they settle where a tau share of runs
+    are shorter.
+    """
+    if estimate is None:
+        return 1, actual, actual, actual
+    runs, ewma, p50, p90 = estimate
+    step = QUANTILE_STEP * max(ewma, 1)
+    p50 += step * (0.5 if actual > p50 else -0.5)
+    p90 += step * (0.9 if actual > p90 else -0.1)
+    ewma += EWMA_ALPHA * (actual - ewma)
+    return runs + 1, ewma, max(p50, 0), max(p90, p50, 0)
+
+class Storage:
+    """Owns access to usage_data.db: one tuned connection per thread and typed queries for every view.
+
+    Use Storage.open(db_path) so all components share the same instance.
+    """
+
+    _instances = {}
+    _instances_lock = Lock()
+
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL",  # Readers never block the writer thread and vice versa
+        "PRAGMA synchronous = NORMAL",  # Safe with WAL, avoids an fsync per commit
+        "PRAGMA cache_size = -16000",  # 16 MB page cache per connection
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA busy_timeout = 5000",
+    )
+
+    @classmethod
+    def open(cls, db_path):
+        """Return the shared Storage for `db_path`."""
+        key = os.path.abspath(db_path)
+        with cls._instances_lock:
+            storage = cls._instances.get(key)
+            if storage is None:
+                storage = cls._instances[key] = cls(key)
+            return storage
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = local()
+        self.connections = []  # Every per-thread connection, for close_all()
+        self.connections_lock = Lock()
+        self.versions = {"usage": 0, "names": 0, "classifications": 0}  # Bumped after each committed write
+        self.names_cache = None  # (names version, {original_name: custom_name})
+        self.usage_dates = {}  # {ISO date: usage version of the last write to that date}
+        self.usage_reset = 0  # Usage version of the last write that may have touched any date
+
+    @property
+    def conn(self):
+        """The calling thread's connection, created and tuned on first use."""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, cached_statements=256, check_same_thread=False)
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            self.local.conn = conn
+            with self.connections_lock:
+                self.connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Run the block in one transaction on the calling thread's connection."""
+        conn = self.conn
+        with conn:
+            yield conn
+
+    def version(self, kind):
+        """Return the write counter for "usage", "names" or "classifications"; caches compare it to stay fresh."""
+        return self.versions[kind]
+
+    def usage_version(self, start_date, end_date):
+        """Return the usage version of the last write to a date in start_date..end_date (ISO, inclusive).
+
+        Flushes only touch the dates they write, so caches of other days stay valid.
+        """
+        with self.connections_lock:
+            return max([self.usage_reset] + [
+                version for day, version in self.usage_dates.items() if start_date <= day <= end_date
+            ])
+
+    def _bump(self, kind, dates=None):
+        """Count a committed write; for "usage", `dates` are the dates it touched (default every date)."""
+        with self.connections_lock:
+            self.versions[kind] += 1
+            if kind == "usage":
+                if dates is None:
+                    self.usage_reset = self.versions[kind]
+                else:
+                    for day in dates:
+                        self.usage_dates[day] = self.versions[kind]
+
+    def close_all(self):
+        """Close every connection; threads reconnect on their next query."""
+        with self.connections_lock:
+            for conn in self.connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self.connections = []
+        self.local = local()
+
+    def setup(self):
+        """Create the data directory and bring the schema up to date."""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        return self.migrate()
+
+    def migrate(self):
+        """Apply pending schema migrations; returns the schema version."""
+        return migrations.migrate(self.conn)
+
+    # Usage data
+
+    def add_focus_deltas(self, rows):
+        """Add (date, app_name, seconds) rows to usage_data and the rollups in one transaction."""
+        rollup_rows = [
+            (period, bucket, app_name, seconds)
+            for day, app_name, seconds in rows
+            for period, bucket in rollup_buckets(day)
+        ]
+        with self.transaction() as conn:
+            conn.executemany("""
+                INSERT INTO usage_data (date, app_name, focus_time)
+                VALUES (?, ?, ?)
+                ON CONFLICT(date, app_name) DO UPDATE SET focus_time = focus_time + excluded.focus_time
+            """, rows)
+            conn.executemany("""
+                INSERT INTO usage_rollup (period, bucket, app_name, focus_time)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(period, bucket, app_name) DO UPDATE SET focus_time = focus_time + excluded.focus_time
+            """, rollup_rows)
+            conn.executemany("""
+                INSERT INTO category_rollup (period, bucket, category, focus_time)
+                VALUES (?, ?, COALESCE((SELECT category FROM classify_app WHERE app_name = ?), ?), ?)
+                ON CONFLICT(period, bucket, category) DO UPDATE SET focus_time = focus_time + excluded.focus_time
+            """, [(period, bucket, app_name, UNCLASSIFIED, seconds) for period, bucket, app_name, seconds in rollup_rows])
+            conn.executemany("""
+                INSERT INTO app_totals (name, focus_time)
+                VALUES (COALESCE((SELECT custom_name FROM app_names WHERE original_name = ?), ?), ?)
+                ON CONFLICT(name) DO UPDATE SET focus_time = focus_time + excluded.focus_time
+            """, [(app_name, app_name, seconds) for _, app_name, seconds in rows])
+        self._bump("usage", {day for day, _, _ in rows})
+
+    def usage_for_date(self, day):
+        """Return [(app_name, focus_time)] recorded on `day` (an ISO date string), by display name."""
+        return self.conn.execute(
+            "SELECT display_name, SUM(focus_time) FROM resolved_usage WHERE date = ? GROUP BY display_name", (day,)
+        ).fetchall()
+
+    def usage_since(self, start_date):
+        """Return [(app_name, focus_time)] summed over every day from `start_date` to today."""
+        return self.usage_between(start_date, date.today().isoformat())
+
+    def usage_between(self, start_date, end_date):
+        """Return [(app_name, focus_time)] summed over `start_date`..`end_date` (inclusive), largest first."""
+        return self._range_totals(
+            "(SELECT period, bucket, display_name AS app_name, focus_time FROM resolved_rollup)", "app_name",
+            "SELECT date, display_name AS app_name, focus_time FROM resolved_usage", start_date, end_date
+        )
+
+    def category_between(self, start_date, end_date):
+        """Return [(category, focus_time)] summed over `start_date`..`end_date` (inclusive), largest first."""
+        raw = f"""
+            SELECT u.date, COALESCE(c.category, '{UNCLASSIFIED}') AS category, u.focus_time
+            FROM usage_data u LEFT JOIN classify_app c ON c.app_name = u.app_name
+        """
+        return self._range_totals("category_rollup", "category", raw, start_date, end_date)
+
+    def _range_totals(self, rollup, key, raw, start_date, end_date):
+        """Sum whole months from `rollup` and read raw rows only for the partial months at either edge."""
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+        first_month = start if start.day == 1 else _next_month(start)  # First day of the first whole month
+        end_month = _next_month(end) if (end + timedelta(days=1)).day == 1 else end.replace(day=1)  # Day after the last one
+        if first_month >= end_month:
+            first_month = end_month = end + timedelta(days=1)  # No whole month in range, raw rows only
+        return self.conn.execute(f"""
+            SELECT {key}, SUM(focus_time) FROM (
+                SELECT {key}, focus_time FROM ({raw}) WHERE date >= ? AND date < ?
+                UNION ALL SELECT {key}, focus_time FROM ({raw}) WHERE date >= ? AND date <= ?
+                UNION ALL SELECT {key}, focus_time FROM {rollup} WHERE period = 'month' AND bucket >= ? AND bucket < ?
+            )
+            GROUP BY {key}
+            ORDER BY SUM(focus_time) DESC
+        """, (
+            start.isoformat(), first_month.isoformat(),
+            end_month.isoformat(), end.isoformat(),
+            first_month.isoformat()[:7], end_month.isoformat()[:7],
+        )).fetchall()
+
+    def usage_totals(self):
+        """Return [(app_name, focus_time)] over all days by display name, largest first."""
+        return self.conn.execute("SELECT name, focus_time FROM app_totals ORDER BY focus_time DESC").fetchall()
+
+    def usage_totals_page(self, after=None, limit=100, descending=True, backward=False):
+        """Return up to `limit` [(app_name, focus_time)] rows of the all-time totals, in display order.
+
+        Keyset pagination over idx_app_totals_time: `after` is the (app_name, focus_time) row at the
+        edge of the previous page, and `backward` fetches the rows just before it instead.
+        """
+        forward_desc = descending != backward
+        where = ""
+        params = ()
+        if after is not None:
+            where = f"WHERE (focus_time, name) {'<' if forward_desc else '>'} (?, ?)"
+            params = (after[1], after[0])
+        order = "DESC" if forward_desc else "ASC"
+        rows = self.conn.execute(
+            f"SELECT name, focus_time FROM app_totals {where} ORDER BY focus_time {order}, name {order} LIMIT ?",
+            params + (limit,)
+        ).fetchall()
+        return rows[::-1] if backward else rows
+
+    def category_totals(self):
+        """Return [(category, focus_time)] over all days, largest first."""
+        return self.conn.execute(
+            "SELECT category, focus_time FROM category_rollup WHERE period = 'all' AND bucket = '' ORDER BY focus_time DESC"
+        ).fetchall()
+
+    def rebuild_rollups(self):
+        """Regenerate the rollup tables from usage_data."""
+        with self.transaction() as conn:
+            migrations.rebuild_rollups(conn)
+            migrations.rebuild_app_totals(conn)
+        self._bump("usage")
+
+    def usage_app_names(self):
+        """Return every app name that has usage data."""
+        return [row[0] for row in self.conn.execute("SELECT app_name FROM usage_data GROUP BY app_name")]
+
+    def earliest_date(self):
+        """Return the first ISO date with usage data, or None."""
+        return self.conn.execute("SELECT MIN(date) FROM usage_data").fetchone()[0]
+
+    def daily_totals(self, start_date, end_date):
+        """Return {date: focus_time} for every day with data in `start_date`..`end_date` (inclusive)."""
+        return dict(self.conn.execute(
+            "SELECT date, SUM(focus_time) FROM usage_data WHERE date BETWEEN ? AND ? GROUP BY date", (start_date, end_date)
+        ).fetchall())
+
+    # App identity
+
+    def app_ids(self):
+        """Return [(id, name)] from the apps table."""
+        return self.conn.execute("SELECT id, name FROM apps").fetchall()
+
+    def intern_app(self, name):
+        """Return the id of `name` in the apps table, adding it if needed."""
+        with self.transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO apps (name) VALUES (?)", (name,))
+            return conn.execute("SELECT id FROM apps WHERE name = ?", (name,)).fetchone()[0]
+
+    def custom_names(self):
+        """Return {original_name: custom_name} for every aliased app.
+
+        The map is cached until the next rename, so callers polling it do no I/O; treat it as read-only.
+        """
+        version = self.versions["names"]
+        cached = self.names_cache
+        if cached and cached[0] == version:
+            return cached[1]
+        names = dict(self.conn.execute("SELECT original_name, custom_name FROM app_names").fetchall())
+        self.names_cache = (version, names)
+        return names
+
+    def rename_app(self, old_name, new_name):
+        """Show `old_name` as `new_name`, merging it into `new_name` if that name already exists.
+
+        Only alias, identity and app_totals rows are written, never usage_data, so the cost does
+        not depend on history and unalias_app undoes a merge.
+        """
+        if old_name == new_name:
+            return
+        with self.transaction() as conn:
+            shown_as = conn.execute("SELECT custom_name FROM app_names WHERE original_name = ?", (old_name,)).fetchone()
+            old_id = self._identity_id(conn, old_name)
+            new_id = self._identity_id(conn, new_name)
+            if old_id is None:
+                # A name that has been shown as itself until now
+                if new_id is None:
+                    new_id = conn.execute("INSERT INTO app_identities (name) VALUES (?)", (new_name,)).lastrowid
+                conn.execute("INSERT OR REPLACE INTO app_aliases (app_name, identity_id) VALUES (?, ?)", (old_name, new_id))
+            elif new_id is None:
+                conn.execute("UPDATE app_identities SET name = ? WHERE id = ?", (new_name, old_id))
+                new_id = old_id
+            else:
+                # Merge two identities by repointing the aliases of the old one
+                conn.execute("UPDATE app_aliases SET identity_id = ? WHERE identity_id = ?", (new_id, old_id))
+                conn.execute("DELETE FROM app_identities WHERE id = ?", (old_id,))
+            # An app actually called `new_name` is the same app from now on
+            conn.execute("INSERT OR IGNORE INTO app_aliases (app_name, identity_id) VALUES (?, ?)", (new_name, new_id))
+            self._refresh_app_totals(conn, {old_name, new_name, shown_as[0] if shown_as else old_name})
+        self._bump("names")
+
+    def merge_app(self, old_name, new_name):
+        """Merge the focus times of `old_name` into `new_name`."""
+        self.rename_app(old_name, new_name)
+
+    def unalias_app(self, app_name):
+        """Show the app recorded as `app_name` under its own name again."""
+        with self.transaction() as conn:
+            row = conn.execute("SELECT identity_id FROM app_aliases WHERE app_name = ?", (app_name,)).fetchone()
+            if not row:
+                return
+            shown_as = conn.execute("SELECT name FROM app_identities WHERE id = ?", (row[0],)).fetchone()[0]
+            conn.execute("DELETE FROM app_aliases WHERE app_name = ?", (app_name,))
+            conn.execute(
+                "DELETE FROM app_identities WHERE id = ? AND NOT EXISTS (SELECT 1 FROM app_aliases WHERE identity_id = ?)",
+                (row[0], row[0])
+            )
+            self._refresh_app_totals(conn, {app_name, shown_as})
+        self._bump("names")
+
+    def app_aliases(self, name):
+        """Return the recorded app names shown as `name`."""
+        return [row[0] for row in self.conn.execute("SELECT original_name FROM app_names WHERE custom_name = ?", (name,))]
+
+    def _refresh_app_totals(self, conn, names):
+        """Recompute the app_totals rows of display `names` from the all-time rollup of their aliases."""
+        for name in names:
+            total = conn.execute("""
+                SELECT SUM(focus_time) FROM usage_rollup
+                WHERE period = 'all' AND bucket = '' AND app_name IN (
+                    SELECT original_name FROM app_names WHERE custom_name = ?
+                    UNION SELECT ? WHERE NOT EXISTS (SELECT 1 FROM app_aliases WHERE app_name = ?)
+                )
+            """, (name, name, name)).fetchone()[0]
+            if total is None:
+                conn.execute("DELETE FROM app_totals WHERE name = ?", (name,))
+            else:
+                conn.execute("INSERT OR REPLACE INTO app_totals (name, focus_time) VALUES (?, ?)", (name, total))
+
+    def _identity_id(self, conn, name):
+        row = conn.execute("SELECT id FROM app_identities WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    # Classification
+
+    def classifications(self):
+        """Return [(app_name, category)] from classify_app."""
+        return self.conn.execute("SELECT app_name, category FROM classify_app").fetchall()
+
+    def labels(self):
+        """Return [(app_name, category)] of the categories the user picked."""
+        return self.conn.execute("SELECT app_name, category FROM classify_app WHERE labelled = 1").fetchall()
+
+    def set_classifications(self, rows, labelled=True):
+        """Store (app_name, category) rows in one transaction, moving their category rollups along.
+
+        Rows with `labelled` off are guesses and never replace a category the user picked.
+        """
+        rows = list(rows)
+        app_names = [app_name for app_name, _ in rows]
+        with self.transaction() as conn:
+            migrations.add_category_rollups(conn, app_names, sign=-1)
+            conn.executemany(
+                """
+                INSERT INTO classify_app (app_name, category, labelled)
+                VALUES (?, ?, ?)
+                ON CONFLICT(app_name) DO UPDATE SET category = excluded.category, labelled = excluded.labelled
+                WHERE excluded.labelled = 1 OR classify_app.labelled = 0
+                """, [(app_name, category, int(labelled)) for app_name, category in rows]
+            )
+            migrations.add_category_rollups(conn, app_names)
+        self._bump("classifications")
+
+    # Schedules
+
+    def schedule_names(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM schedules ORDER BY id")]
+
+    def schedule_items(self, name):
+        """Return [(type, duration, id)] of the schedule called `name`, in order."""
+        return self.conn.execute("""
+            SELECT t.type, t.duration, t.id
+            FROM schedule_times t JOIN schedules s ON s.id = t.schedule_id
+            WHERE s.name = ?
+            ORDER BY t.position
+        """, (name,)).fetchall()
+
+    def append_task(self, name, task_type, duration):
+        """Append a task to the schedule called `name`, creating the schedule if needed. Returns the task id."""
+        with self.transaction() as conn:
+            schedule_id = self._schedule_id(conn, name)
+            cursor = conn.execute("""
+                INSERT INTO schedule_times (schedule_id, position, type, duration)
+                VALUES (?, (SELECT COALESCE(MAX(position) + 1, 0) FROM schedule_times WHERE schedule_id = ?), ?, ?)
+            """, (schedule_id, schedule_id, task_type, duration))
+            return cursor.lastrowid
+
+    def write_schedule(self, name, tasks, replace=False):
+        """Write (type, duration) rows as the schedule called `name` in one transaction.
+
+        An existing schedule is only overwritten with `replace`; returns whether the rows were written.
+        """
+        with self.transaction() as conn:
+            if not replace and conn.execute("SELECT 1 FROM schedules WHERE name = ?", (name,)).fetchone():
+                return False
+            schedule_id = self._schedule_id(conn, name)
+            conn.execute("DELETE FROM schedule_times WHERE schedule_id = ?", (schedule_id,))
+            conn.executemany(
+                "INSERT INTO schedule_times (schedule_id, position, type, duration) VALUES (?, ?, ?, ?)",
+                [(schedule_id, position, task_type, duration) for position, (task_type, duration) in enumerate(tasks)]
+            )
+        return True
+
+    def _schedule_id(self, conn, name):
+        conn.execute("INSERT OR IGNORE INTO schedules (name) VALUES (?)", (name,))
+        return conn.execute("SELECT id FROM schedules WHERE name = ?", (name,)).fetchone()[0]
+
+    def update_task(self, task_id, task_type, duration=None):
+        with self.transaction() as conn:
+            if duration is not None:
+                conn.execute("UPDATE schedule_times SET type = ?, duration = ? WHERE id = ?", (task_type, duration, task_id))
+            else:
+                conn.execute("UPDATE schedule_times SET type = ? WHERE id = ?", (task_type, task_id))
+
+    def remove_task(self, name, task_id):
+        """Delete a task; the schedule called `name` is deleted with its last task."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM schedule_times WHERE id = ?", (task_id,))
+            conn.execute("""
+                DELETE FROM schedules
+                WHERE name = ? AND NOT EXISTS (SELECT 1 FROM schedule_times WHERE schedule_id = schedules.id)
+            """, (name,))
+
+    def reorder_tasks(self, name, task_ids):
+        """Put the tasks of `name` in the order of `task_ids`; unlisted tasks keep their order after them."""
+        with self.transaction() as conn:
+            row = conn.execute("SELECT id FROM schedules WHERE name = ?", (name,)).fetchone()
+            if not row:
+                return
+            schedule_id = row[0]
+            current = [task_id for task_id, in conn.execute(
+                "SELECT id FROM schedule_times WHERE schedule_id = ? ORDER BY position", (schedule_id,)
+            )]
+            current_set = set(current)
+            listed = [int(task_id) for task_id in task_ids if int(task_id) in current_set]
+            listed_set = set(listed)
+            order = listed + [task_id for task_id in current if task_id not in listed_set]
+            # Move every task out of the way first so the UNIQUE(schedule_id, position) pairs never collide
+            conn.execute("UPDATE schedule_times SET position = -1 - position WHERE schedule_id = ?", (schedule_id,))
+            conn.executemany(
+                "UPDATE schedule_times SET position = ? WHERE id = ?",
+                [(position, task_id) for position, task_id in enumerate(order)]
+            )
+
+    def check_schedules(self, repair=False):
+        """Return a list of schedule integrity problems, fixing them when `repair` is set.
+
+        Looks for tasks whose schedule no longer exists, schedules without tasks,
+        and positions with gaps (left by removals; harmless, but compacted on repair).
+        """
+        conn = self.conn
+        problems = []
+        orphaned = conn.execute(
+            "SELECT COUNT(*) FROM schedule_times WHERE schedule_id NOT IN (SELECT id FROM schedules)"
+        ).fetchone()[0]
+        if orphaned:
+            problems.append(f"{orphaned} task(s) without a schedule")
+        empty = [name for name, in conn.execute(
+            "SELECT name FROM schedules WHERE id NOT IN (SELECT schedule_id FROM schedule_times)"
+        )]
+        if empty:
+            problems.append(f"schedule(s) without tasks: {', '.join(empty)}")
+        gapped = [(schedule_id, name) for schedule_id, name in conn.execute("""
+            SELECT s.id, s.name FROM schedules s JOIN schedule_times t ON t.schedule_id = s.id
+            GROUP BY s.id HAVING MAX(t.position) + 1 != COUNT(*) OR MIN(t.position) != 0
+        """)]
+        if gapped:
+            problems.append(f"schedule(s) with position gaps: {', '.join(name for _, name in gapped)}")
+        if repair and problems:
+            with self.transaction() as conn:
+                conn.execute("DELETE FROM schedule_times WHERE schedule_id NOT IN (SELECT id FROM schedules)")
+                conn.execute("DELETE FROM schedules WHERE id NOT IN (SELECT schedule_id FROM schedule_times)")
+            for _, name in gapped:
+                self.reorder_tasks(name, [])
+        return problems
+
+    # Task history
+
+    def record_task_run(self, task_name, planned, actual):
+        """Log a finished schedule block and update its task's estimates in one transaction. Returns the new estimate."""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO task_runs (task_name, planned, actual, ended_at) VALUES (?, ?, ?, datetime('now'))",
+                (task_name, planned, actual)
+            )
+            estimate = update_estimate(self._task_estimate(conn, task_name), actual)
+            conn.execute("""
+                INSERT INTO task_estimates (task_name, runs, ewma, p50, p90)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(task_name) DO UPDATE SET
+                    runs = excluded.runs, ewma = excluded.ewma, p50 = excluded.p50, p90 = excluded.p90
+            """, (task_name,) + estimate)
+        return estimate
+
+    def task_estimate(self, task_name):
+        """Return (runs, ewma, p50, p90) in seconds for `task_name`, or None before its first run."""
+        return self._task_estimate(self.conn, task_name)
+
+    def _task_estimate(self, conn, task_name):
+        return conn.execute(
+            "SELECT runs, ewma, p50, p90 FROM task_estimates WHERE task_name = ?", (task_name,)
+        ).fetchone()
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintenance commands for the usage database.")
+    parser.add_argument("command", choices=["migrate", "rebuild-rollups", "check-schedules"])
+    parser.add_argument("db_path", help="Path to usage_data.db")
+    args = parser.parse_args()
+    storage = Storage.open(args.db_path)
+    version = storage.setup()
+    if args.command == "rebuild-rollups":
+        storage.rebuild_rollups()
+        print(f"Rebuilt rollups of {args.db_path}")
+    elif args.command == "check-schedules":
+        problems = storage.check_schedules(repair=True)
+        print("\n".join(f"Repaired {problem}" for problem in problems) or "Schedules are consistent")
+    else:
+        print(f"{args.db_path} is at schema version {version}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# clock/usage_writer.py
+import queue
+import sqlite3
+from threading import Thread, Event
+from storage import Storage
+
+class UsageWriter:
+    """Background thread that batches focus deltas into usage_data."""
+
+    def __init__(self, db_path, flush_interval=30, checkpoint=None, periodic=True):
+        self.storage = Storage.open(db_path)
+        self.flush_interval = flush_interval  # Seconds between periodic flushes
+        self.checkpoint = checkpoint  # Called before each flush to enqueue the running span
+        self.periodic = periodic  # Flush on the timer, otherwise only when requested
+        self.deltas = queue.Queue()  # (date, app_name, seconds)
+        self.thread = None
+        self._wake = Event()
+        self._stopping = False
+        self._flush_requested = False
+
+    def start(self):
+        """Start the writer thread."""
+        if self.thread and self.thread.is_alive():
+            return
+        self._stopping = False
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self, flush=True):
+        """Stop the writer thread, optionally flushing whatever is still queued."""
+        if not self.thread:
+            return
+        self._stopping = True
+        self._flush_requested = flush
+        self._wake.set()
+        self.thread.join()
+        self.thread = None
+
+    def put(self, day, app_name, seconds):
+        """Queue `seconds` of focus time for `app_name` on `day`."""
+        if seconds:
+            self.deltas.put((day, app_name, seconds))
+
+    def request_flush(self):
+        """Ask the writer thread to flush as soon as possible without waiting for it."""
+        self._flush_requested = True
+        self._wake.set()
+
+    def _run(self):
+        """Flush queued deltas every flush_interval seconds or on request."""
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._flush_requested or (self.periodic and not self._stopping):
+                self._flush_requested = False
+                self.flush()
+            if self._stopping:
+                return
+
+    def flush(self):
+        """Drain the queue and write the deltas in a single transaction."""
+        if self.checkpoint:
+            self.checkpoint()
+        totals = {}
+        while True:
+            try:
+                day, app_name, seconds = self.deltas.get_nowait()
+            except queue.Empty:
+                break
+            totals[(day, app_name)] = totals.get((day, app_name), 0) + seconds
+        if not totals:
+            return
+        rows = [(day, app_name, seconds) for (day, app_name), seconds in totals.items()]
+        try:
+            self.storage.add_focus_deltas(rows)
+        except sqlite3.Error as e:
+            print(f"Error writing focus times: {e}")
+            # Keep the deltas for the next flush instead of dropping them
+            for row in rows:
+                self.deltas.put(row)
@@ -0,0 +1,138 @@
+# clock/virtual_list.py
+
+class VirtualList:
+    """Shows a keyset-paginated result in a ttk Treeview, keeping only a few pages of rows loaded.
+
+    `fetch(after, limit, backward)` returns up to `limit` rows in display order that come
+    after the row `after` (before it when `backward` is set, from the start when `after`
+    is None). `format_row(row)` returns the Treeview values for a row. Pages are fetched as
+    the view nears either edge of the loaded rows, and pages far from the view are dropped.
+    With a QueryDispatcher as `queries`, fetches run on its workers instead of the Tk thread.
+    """
+
+    def __init__(self, tree, fetch, format_row, page_size=100, max_pages=3, margin=0.15, queries=None, loading_values=None):
+        self.tree = tree
+        self.fetch = fetch
+        self.format_row = format_row
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.margin = margin  # Fraction of the loaded rows left before the next page is fetched
+        self.queries = queries
+        self.loading_values = loading_values  # Placeholder row shown until the first page arrives
+        self.loading_row = None
+        self.pages = []  # [(iids, rows)] for the loaded pages, top to bottom
+        self.more_above = False  # Pages were dropped from the top
+        self.more_below = False  # The last fetch downwards returned a full page
+        self.pending = None  # Outstanding fetch: a QueryTicket, or an after_idle id without `queries`
+        self.active = False
+
+    def load(self):
+        """Show the first page and start following the scroll position."""
+        self.clear()
+        self.active = True
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        if self.loading_values:
+            self.loading_row = self.tree.insert('', 'end', values=self.loading_values)
+        self._request(None, False, self._show_first)
+
+    def detach(self):
+        """Stop following the scroll position and remove the rows."""
+        self.active = False
+        self.tree.configure(yscrollcommand="")
+        self.clear()
+
+    def clear(self):
+        if self.pending is not None:
+            if self.queries:
+                self.pending.cancel()
+            else:
+                self.tree.after_cancel(self.pending)
+            self.pending = None
+        self._remove_loading_row()
+        for iids, _ in self.pages:
+            self.tree.delete(*iids)
+        self.pages = []
+        self.more_above = self.more_below = False
+
+    def _request(self, after, backward, apply):
+        if self.queries:
+            self.pending = self.queries.submit(self.fetch, after, self.page_size, backward, on_result=apply, owner=self)
+        else:
+            # Deferred so the tree is never changed from inside its own scroll callback
+            self.pending = self.tree.after_idle(lambda: apply(self.fetch(after, self.page_size, backward)))
+
+    def _on_scroll(self, first, last):
+        if not self.active or not self.pages or self.pending is not None:
+            return
+        if float(last) >= 1 - self.margin and self.more_below:
+            self._request(self.pages[-1][1][-1], False, self._show_below)
+        elif float(first) <= self.margin and self.more_above:
+            self._request(self.pages[0][1][0], True, self._show_above)
+
+    def _show_first(self, rows):
+        self.pending = None
+        if not self.active or not self.tree.winfo_exists():
+            return
+        self._remove_loading_row()
+        self._add_page(rows, at_end=True)
+        self.more_below = len(rows) == self.page_size
+        self.tree.yview_moveto(0)
+
+    def _show_below(self, rows):
+        self.pending = None
+        if not self.active or not self.tree.winfo_exists():
+            return
+        self.more_below = len(rows) == self.page_size
+        if not rows:
+            return
+        self._add_page(rows, at_end=True)
+        if len(self.pages) > self.max_pages:
+            self._drop_page(at_end=False)
+            self.more_above = True
+
+    def _show_above(self, rows):
+        self.pending = None
+        if not self.active or not self.tree.winfo_exists():
+            return
+        self.more_above = len(rows) == self.page_size
+        if not rows:
+            return
+        self._add_page(rows, at_end=False)
+        if len(self.pages) > self.max_pages:
+            self._drop_page(at_end=True)
+            self.more_below = True
+
+    def _remove_loading_row(self):
+        if self.loading_row is not None:
+            if self.tree.exists(self.loading_row):
+                self.tree.delete(self.loading_row)
+            self.loading_row = None
+
+    def _add_page(self, rows, at_end):
+        """Insert a page, keeping the rows under the view where they were."""
+        if not rows:
+            return
+        top, loaded = self.tree.yview()[0], self._row_count()
+        if at_end:
+            iids = [self.tree.insert('', 'end', values=self.format_row(row)) for row in rows]
+            self.pages.append((iids, rows))
+            self._keep_view(top, loaded, 0)
+        else:
+            iids = [self.tree.insert('', index, values=self.format_row(row)) for index, row in enumerate(rows)]
+            self.pages.insert(0, (iids, rows))
+            self._keep_view(top, loaded, len(rows))
+
+    def _drop_page(self, at_end):
+        top, loaded = self.tree.yview()[0], self._row_count()
+        iids, rows = self.pages.pop(-1 if at_end else 0)
+        self.tree.delete(*iids)
+        self._keep_view(top, loaded, 0 if at_end else -len(rows))
+
+    def _keep_view(self, top, loaded, shift):
+        """Scroll so the first visible row stays put after `shift` rows were added (or removed) above it."""
+        total = self._row_count()
+        if total:
+            self.tree.yview_moveto(max(0, top * loaded + shift) / total)
+
+    def _row_count(self):
+        return sum(len(iids) for iids, _ in self.pages)
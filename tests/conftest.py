@@ -0,0 +1,6 @@
+# tests/conftest.py
+import os
+import sys
+
+# The clock modules import each other by bare name, as when run from clock/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "clock"))
@@ -0,0 +1,87 @@
+# tests/test_deadline_timer.py
+from deadline_timer import DeadlineTimer
+
+class FakeClock:
+    """Monotonic clock the tests move by hand."""
+
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class FakeRoot:
+    """Stands in for Tk's after/after_cancel; every callback starts `latency` seconds late."""
+
+    def __init__(self, clock, latency=0.0):
+        self.clock = clock
+        self.latency = latency
+        self.jobs = {}  # {job id: (due, fn)}
+        self.next_id = 0
+
+    def after(self, ms, fn):
+        self.next_id += 1
+        self.jobs[self.next_id] = (self.clock.now + ms / 1000, fn)
+        return self.next_id
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run(self, until=float("inf")):
+        """Run due callbacks in order until none are left before `until`."""
+        while self.jobs:
+            job = min(self.jobs, key=lambda j: self.jobs[j][0])
+            due, fn = self.jobs[job]
+            if due > until:
+                self.clock.now = until
+                return
+            del self.jobs[job]
+            self.clock.now = max(self.clock.now, due) + self.latency
+            fn()
+
+def make_timer(latency=0.0):
+    clock = FakeClock()
+    root = FakeRoot(clock, latency)
+    ticks, expired = [], []
+    timer = DeadlineTimer(root, ticks.append, lambda: expired.append(clock.now), clock=clock)
+    return timer, root, clock, ticks, expired
+
+def test_expires_within_one_callback_of_deadline_under_latency():
+    timer, root, clock, ticks, expired = make_timer(latency=0.37)
+    timer.start(3000)
+    root.run()
+    assert len(expired) == 1
+    # Late callbacks do not accumulate: the run ends at most one callback latency late
+    assert 3000 <= expired[0] - 100 <= 3000 + 0.37 + 0.001
+    assert not timer.active
+
+def test_missed_ticks_are_coalesced():
+    timer, root, clock, ticks, expired = make_timer()
+    timer.start(60)
+    root.run(until=110)
+    shown = len(ticks)
+    clock.now += 20  # The Tk thread was blocked for 20 seconds
+    root.run(until=clock.now)
+    assert len(ticks) == shown + 1  # One catch-up tick, not twenty
+    assert abs(ticks[-1] - (160 - clock.now)) < 1e-9
+
+def test_pause_and_resume_shift_the_deadline():
+    timer, root, clock, ticks, expired = make_timer()
+    timer.start(10)
+    root.run(until=104)
+    timer.pause()
+    assert timer.paused and abs(timer.remaining() - 6) < 1e-9
+    clock.now += 50  # Time spent paused does not count
+    assert abs(timer.remaining() - 6) < 1e-9
+    timer.resume()
+    root.run()
+    assert expired == [160]
+
+def test_cancel_does_not_expire():
+    timer, root, clock, ticks, expired = make_timer()
+    timer.start(10)
+    root.run(until=103)
+    timer.cancel()
+    root.run()
+    assert expired == []
+    assert not timer.active and timer.remaining() == 0
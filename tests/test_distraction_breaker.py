@@ -0,0 +1,66 @@
+from threading import Thread
+
+import pytest
+
+openai = pytest.importorskip("openai")
+pytest.importorskip("dotenv")
+if not openai.version.VERSION.startswith("0."):
+    pytest.skip("DetectDistraction calls the pre-1.0 openai API", allow_module_level=True)
+
+from distraction import DetectDistraction, UNKNOWN
+from fake_classifier import FakeClassifierServer
+
+
+@pytest.fixture
+def server():
+    server = FakeClassifierServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def api_key(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+
+def run_concurrently(target, threads):
+    workers = [Thread(target=target) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def test_concurrent_failures_are_all_counted(server):
+    server.failure_rate = 1.0
+    detector = DetectDistraction(api_base=server.url, retries=1, backoff=0, failure_threshold=1000)
+
+    def classify():
+        for i in range(10):
+            detector.classify(f"app {i}")
+
+    run_concurrently(classify, 8)
+
+    assert server.requests == 80
+    assert detector.failures == 80
+    assert detector.opened_at is None
+
+
+def test_open_breaker_lets_one_probe_through(server):
+    server.failure_rate = 1.0
+    detector = DetectDistraction(api_base=server.url, retries=1, backoff=0, failure_threshold=2, reset_after=60)
+    detector.classify("Code")
+    detector.classify("Code")
+    assert detector.classify("Code") == UNKNOWN
+    assert server.requests == 2  # Open: the third call never reached the endpoint
+
+    server.failure_rate = 0.0
+    server.latency = 0.2  # Keep the probe in flight while the other workers check the breaker
+    detector.opened_at -= detector.reset_after
+    results = []
+    run_concurrently(lambda: results.append(detector.classify("YouTube")), 4)
+
+    assert server.requests == 3
+    assert sorted(results) == ["NONPRODUCTIVE"] + [UNKNOWN] * 3
+    assert detector.failures == 0
+    assert detector.opened_at is None
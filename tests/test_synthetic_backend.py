@@ -0,0 +1,42 @@
+import json
+import time
+
+import pytest
+
+from focus_backends import SyntheticBackend, get_backend
+from storage import Storage
+
+
+def test_get_backend_selects_synthetic(monkeypatch, tmp_path):
+    script = tmp_path / "script.json"
+    script.write_text(json.dumps([["Editor", 60], ["Terminal", 30]]))
+    monkeypatch.setenv("SMART_CLOCK_BACKEND", "Synthetic")
+    monkeypatch.setenv("SMART_CLOCK_SYNTHETIC_SCRIPT", str(script))
+
+    backend = get_backend()
+
+    assert isinstance(backend, SyntheticBackend)
+    assert backend.script == [("Editor", 60), ("Terminal", 30)]
+    assert backend.get_focused_app() == "Editor"
+
+
+def test_monitor_records_synthetic_focus(tmp_path):
+    pytest.importorskip("pynput", exc_type=ImportError)  # Fails to import without a display
+    from app_monitor import AppMonitor
+
+    db_path = str(tmp_path / "usage_data.db")
+    Storage.open(db_path).migrate()
+    backend = SyntheticBackend([("Editor", 0.4), ("Terminal", 60)], loop=False)
+    monitor = AppMonitor(db_path, afk_threshold=60, backend=backend)
+    monitor.classifier.remote = False  # Classify locally, without network access
+    monitor.sample_interval = 0.05
+
+    monitor.start_monitoring()
+    time.sleep(1.0)
+    monitor.stop_monitoring()
+
+    times = monitor.get_app_times()
+    assert set(times) == {"Editor", "Terminal"}
+    # Sampling every 50ms attributes the 0.4s step to within a couple of samples
+    assert times["Editor"] == pytest.approx(0.4, abs=0.15)
+    assert times["Terminal"] == pytest.approx(0.6, abs=0.15)  # Open until stop_monitoring